@@ -11,8 +11,16 @@ import sys
 import os
 import re
 import getpass
+import tempfile
+import threading
+from contextlib import contextmanager
 from yaml.loader import SafeLoader
 
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locking, writes are still atomic
+    fcntl = None
+
 # ANSI Color Codes
 RED = '\033[0;31m'
 GREEN = '\033[0;32m'
@@ -25,6 +33,7 @@ BOLD = '\033[1m'
 NC = '\033[0m'  # No Color
 
 CONFIG_FILE = 'auth_config.yaml'
+LOCK_FILE = CONFIG_FILE + '.lock'
 
 #═══════════════════════════════════════════════════════════════════════════════
 # Utility Functions
@@ -71,31 +80,76 @@ def validate_username(username):
 # Configuration Management
 #═══════════════════════════════════════════════════════════════════════════════
 
+# Per thread: Streamlit serves sessions from several threads of one process,
+# and each must take the flock itself (its own open file => its own lock)
+_lock_state = threading.local()
+
+@contextmanager
+def config_lock(exclusive=True):
+    """Advisory lock around auth_config.yaml; re-entrant within one thread"""
+    if getattr(_lock_state, 'held', False) or fcntl is None:
+        yield
+        return
+    with open(LOCK_FILE, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        _lock_state.held = True
+        try:
+            yield
+        finally:
+            _lock_state.held = False
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def config_stamp(path=CONFIG_FILE):
+    """(mtime_ns, size) of the config file; changes whenever the file is rewritten"""
+    try:
+        info = os.stat(path)
+        return (info.st_mtime_ns, info.st_size)
+    except FileNotFoundError:
+        return None
+
+def read_config(path=CONFIG_FILE):
+    """Parse the config file under a shared lock (raises on missing/invalid file)"""
+    with config_lock(exclusive=False):
+        with open(path) as file:
+            config = yaml.load(file, Loader=SafeLoader)
+    if config is None:
+        config = {}
+    if 'credentials' not in config or config['credentials'] is None:
+        config['credentials'] = {}
+    if 'usernames' not in config['credentials'] or config['credentials']['usernames'] is None:
+        config['credentials']['usernames'] = {}
+    return config
+
 def load_config():
     """Load configuration from YAML file"""
     if not os.path.exists(CONFIG_FILE):
         print_error(f"Configuration file '{CONFIG_FILE}' not found!")
         return None
     
-    with open(CONFIG_FILE) as file:
-        try:
-            config = yaml.load(file, Loader=SafeLoader)
-            if config is None:
-                config = {}
-            if 'credentials' not in config or config['credentials'] is None:
-                config['credentials'] = {}
-            if 'usernames' not in config['credentials'] or config['credentials']['usernames'] is None:
-                config['credentials']['usernames'] = {}
-            return config
-        except Exception as e:
-            print_error(f"Error loading configuration: {e}")
-            return {'credentials': {'usernames': {}}}
+    try:
+        return read_config()
+    except Exception as e:
+        print_error(f"Error loading configuration: {e}")
+        return {'credentials': {'usernames': {}}}
 
 def save_config(config):
-    """Save configuration to YAML file"""
+    """Save configuration to YAML file (atomic replace, so readers never see a partial file)"""
     try:
-        with open(CONFIG_FILE, 'w') as file:
-            yaml.dump(config, file, default_flow_style=False)
+        with config_lock():
+            directory = os.path.dirname(os.path.abspath(CONFIG_FILE))
+            fd, tmp_path = tempfile.mkstemp(prefix='.auth_config.', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as file:
+                    yaml.dump(config, file, default_flow_style=False)
+                    file.flush()
+                    os.fsync(file.fileno())
+                if os.path.exists(CONFIG_FILE):
+                    os.chmod(tmp_path, os.stat(CONFIG_FILE).st_mode & 0o777)
+                os.replace(tmp_path, CONFIG_FILE)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
         print_success("Configuration updated successfully!")
         return True
     except Exception as e:
@@ -108,6 +162,13 @@ def save_config(config):
 
 def add_user(username, email, name, raw_password):
     """Add a new admin user"""
+    # Hash before taking the lock; bcrypt is deliberately slow
+    hashed_pw = bcrypt.hashpw(raw_password.encode(), bcrypt.gensalt()).decode()
+    with config_lock():
+        return _add_user_locked(username, email, name, hashed_pw)
+
+def _add_user_locked(username, email, name, hashed_pw):
+    """Add the user to the config; caller holds the config lock"""
     config = load_config()
     if not config:
         return False
@@ -116,9 +177,6 @@ def add_user(username, email, name, raw_password):
         print_warning(f"User '{username}' already exists.")
         return False
 
-    # Hash password
-    hashed_pw = bcrypt.hashpw(raw_password.encode(), bcrypt.gensalt()).decode()
-
     # Add user
     config['credentials']['usernames'][username] = {
         "email": email,
@@ -143,6 +201,11 @@ def add_user(username, email, name, raw_password):
 
 def delete_user(username):
     """Delete an admin user"""
+    with config_lock():
+        return _delete_user_locked(username)
+
+def _delete_user_locked(username):
+    """Remove the user from the config; caller holds the config lock"""
     config = load_config()
     if not config:
         return False
@@ -173,6 +236,43 @@ def delete_user(username):
         return True
     return False
 
+def _servers_label(servers):
+    if servers is None: return "all servers"
+    return ", ".join(servers) or "no servers"
+
+def user_servers(config, username):
+    """Server names the user may see, or None for full access (only when no 'servers' key is set)"""
+    user = config.get('credentials', {}).get('usernames', {}).get(username)
+    if user is None:
+        return []  # e.g. deleted while still logged in
+    if 'servers' not in user:
+        return None
+    # Fail closed: an empty or malformed list grants nothing
+    servers = user['servers']
+    return [str(s) for s in servers] if isinstance(servers, list) else []
+
+def set_user_servers(username, servers):
+    """Restrict a user to the given server names (None = all servers, [] = none)"""
+    with config_lock():
+        config = load_config()
+        if not config:
+            return False
+
+        if username not in config['credentials']['usernames']:
+            print_warning(f"User '{username}' not found.")
+            return False
+
+        user = config['credentials']['usernames'][username]
+        if servers is None:
+            user.pop('servers', None)
+        else:
+            user['servers'] = sorted(set(servers))
+
+        if save_config(config):
+            print_success(f"Server access for '{username}': {_servers_label(user.get('servers'))}")
+            return True
+        return False
+
 def list_users():
     """List all admin users"""
     config = load_config()
@@ -197,6 +297,7 @@ def list_users():
         print(f"  {GREEN}{idx}.{NC} {BOLD}{username}{NC}")
         print(f"     Name:  {name}")
         print(f"     Email: {email}")
+        print(f"     Servers: {_servers_label(data.get('servers'))}")
         print()
     
     return list(usernames.keys())
@@ -303,6 +404,33 @@ def interactive_delete_user():
     else:
         print_info("Deletion cancelled.")
 
+def interactive_scope_user():
+    """Interactive server allow-list editing"""
+    print_banner()
+    print(f"{PURPLE}╔═══════════════════════════════════════════════════════════════╗{NC}")
+    print(f"{PURPLE}║                    Set Server Access                         ║{NC}")
+    print(f"{PURPLE}╚═══════════════════════════════════════════════════════════════╝{NC}")
+    print()
+
+    users = list_users()
+
+    if not users:
+        return
+
+    print()
+
+    while True:
+        username = input(f"{CYAN}Username:{NC} ").strip()
+        if username in users:
+            break
+        print_error(f"User '{username}' not found! Please select from the list above.")
+
+    print_info("Enter server names separated by commas, or leave empty for all servers.")
+    raw = input(f"{CYAN}Servers:{NC} ").strip()
+    servers = [s.strip() for s in raw.split(',') if s.strip()] or None
+    print()
+    set_user_servers(username, servers)
+
 def show_main_menu():
     """Display and handle main menu"""
     while True:
@@ -312,10 +440,11 @@ def show_main_menu():
         print(f"  {GREEN}1){NC} Add New Admin User")
         print(f"  {BLUE}2){NC} List All Admin Users")
         print(f"  {RED}3){NC} Delete Admin User")
+        print(f"  {PURPLE}4){NC} Set Server Access")
         print(f"  {WHITE}0){NC} Exit")
         print()
         
-        choice = input(f"{CYAN}Enter your choice [0-3]:{NC} ").strip()
+        choice = input(f"{CYAN}Enter your choice [0-4]:{NC} ").strip()
         
         if choice == '1':
             interactive_add_user()
@@ -327,6 +456,9 @@ def show_main_menu():
         elif choice == '3':
             interactive_delete_user()
             input(f"\n{CYAN}Press Enter to continue...{NC}")
+        elif choice == '4':
+            interactive_scope_user()
+            input(f"\n{CYAN}Press Enter to continue...{NC}")
         elif choice == '0':
             print()
             print_info("Goodbye!")
@@ -351,6 +483,9 @@ if __name__ == "__main__":
             delete_user(sys.argv[2])
         elif action == "list":
             list_users()
+        elif action == "scope" and len(sys.argv) == 4:
+            servers = None if sys.argv[3] == "*" else [x.strip() for x in sys.argv[3].split(',') if x.strip()]
+            set_user_servers(sys.argv[2], servers)
         else:
             print_error("Invalid arguments!")
             print()
@@ -358,6 +493,7 @@ if __name__ == "__main__":
             print("  python3 admin_manager.py add <username> <email> <name> <password>")
             print("  python3 admin_manager.py del <username>")
             print("  python3 admin_manager.py list")
+            print("  python3 admin_manager.py scope <username> <server1,server2 | *>")
             print()
             print("Or run without arguments for interactive menu:")
             print("  python3 admin_manager.py")
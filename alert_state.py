@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+X-UI Monitor - Alert State
+Persists what we already know about each flagged client across scans
+(first seen, last seen, last notified, status transitions) so the dashboard
+can tell new alerts from ones operators already handled.
+
+    python3 alert_state.py history <server> <email>
+"""
+
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from scanner import STATUS_LABELS, classify_codes, is_alert_status
+
+STATE_FILE = "alert_state.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    server        TEXT NOT NULL,
+    email         TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    first_seen    INTEGER NOT NULL,
+    last_seen     INTEGER NOT NULL,
+    last_notified INTEGER,
+    resolved_at   INTEGER,
+    PRIMARY KEY (server, email)
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_open ON alerts (server, resolved_at);
+CREATE TABLE IF NOT EXISTS transitions (
+    server      TEXT NOT NULL,
+    email       TEXT NOT NULL,
+    from_status TEXT,
+    to_status   TEXT NOT NULL,
+    at          INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transitions_client ON transitions (server, email, at);
+CREATE TABLE IF NOT EXISTS webhook_targets (
+    url      TEXT PRIMARY KEY,
+    added_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS webhook_deliveries (
+    server  TEXT NOT NULL,
+    email   TEXT NOT NULL,
+    url     TEXT NOT NULL,
+    sent_at INTEGER NOT NULL,
+    PRIMARY KEY (server, email, url)
+);
+"""
+
+RESOLVED = "✅ RESOLVED"
+
+# Per-row states handed back to the dashboard
+STATE_NEW = "🆕 New"
+STATE_NOTIFIED = "📨 Notified"
+STATE_OPEN = "Open"
+
+def connect(path=STATE_FILE):
+    conn = sqlite3.connect(path, timeout=10)
+    conn.executescript(SCHEMA)
+    return conn
+
+def current_alerts(blocks, warning_days, warning_gb, hide_days):
+    """
+    {(server, email): status} for every enabled, non-zombie client in an alert
+    status under the given (saved, global) thresholds. Debug Mode and the
+    scanning admin's own thresholds only change what is displayed; clients the
+    dashboard deliberately hides (disabled, expired > hide_days) are never tracked.
+    """
+    current = {}
+    for name, block in blocks:
+        if block.get('metrics') is None:
+            # Collector snapshots only carry the rows the collector displayed
+            for r in block['rows']:
+                if is_alert_status(r.get('Status', '')): current[(name, r['User'])] = r['Status']
+            continue
+        codes, shown = classify_codes(block['metrics'], warning_days, warning_gb, hide_days)
+        emails = block['metrics']['email']
+        for i in np.flatnonzero(shown).tolist():
+            current[(name, emails[i])] = STATUS_LABELS[codes[i]]
+    return current
+
+def record_scan(current, scanned_servers, path=STATE_FILE, now=None):
+    """
+    Fold one scan's alerts (from current_alerts) into the persisted state in a
+    single transaction.
+
+    scanned_servers are the servers that answered this scan; their open alerts
+    that are no longer current (back to OK or gone from the panel) are marked
+    resolved. Failed servers are left alone.
+    Returns (states, resolved): states maps (server, email) -> STATE_*,
+    resolved is a list of dicts for alerts that cleared in this scan.
+    """
+    now = int(now or time.time())
+    scanned = set(scanned_servers)
+    current = {k: v for k, v in current.items() if k[0] in scanned}
+
+    conn = connect(path)
+    try:
+        known = {}
+        if scanned:
+            marks = ",".join("?" * len(scanned))
+            for server, email, status, last_notified, resolved_at, first_seen in conn.execute(
+                    f"SELECT server, email, status, last_notified, resolved_at, first_seen FROM alerts WHERE server IN ({marks})",
+                    tuple(scanned)):
+                known[(server, email)] = (status, last_notified, resolved_at, first_seen)
+
+        upserts, transitions, states, resolved = [], [], {}, []
+        for key, status in current.items():
+            prev = known.get(key)
+            if prev is None or prev[2] is not None:
+                # Brand new, or back again after being resolved
+                upserts.append((key[0], key[1], status, now, now, None))
+                transitions.append((key[0], key[1], RESOLVED if prev else None, status, now))
+                states[key] = STATE_NEW
+                continue
+            prev_status, last_notified, _, first_seen = prev
+            if prev_status != status:
+                # Escalation (e.g. SOON -> EXPIRED) needs a new message, so forget the notification
+                transitions.append((key[0], key[1], prev_status, status, now))
+                last_notified = None
+            upserts.append((key[0], key[1], status, first_seen, now, last_notified))
+            states[key] = STATE_NOTIFIED if last_notified else STATE_OPEN
+
+        resolves = []
+        for key, (status, _, resolved_at, first_seen) in known.items():
+            if resolved_at is None and key not in current:
+                resolves.append((now, key[0], key[1]))
+                transitions.append((key[0], key[1], status, RESOLVED, now))
+                resolved.append({"Server": key[0], "User": key[1], "Status": status,
+                                 "Since": time.strftime("%Y-%m-%d %H:%M", time.localtime(first_seen))})
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO alerts (server, email, status, first_seen, last_seen, last_notified, resolved_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL) "
+                "ON CONFLICT (server, email) DO UPDATE SET status = excluded.status, first_seen = excluded.first_seen, "
+                "last_seen = excluded.last_seen, last_notified = excluded.last_notified, resolved_at = NULL",
+                upserts)
+            # A re-opened alert is news again for every webhook
+            conn.executemany("DELETE FROM webhook_deliveries WHERE server = ? AND email = ?",
+                             [key for key, state in states.items() if state == STATE_NEW])
+            conn.executemany("UPDATE alerts SET resolved_at = ? WHERE server = ? AND email = ?", resolves)
+            conn.executemany("INSERT INTO transitions VALUES (?, ?, ?, ?, ?)", transitions)
+        return states, resolved
+    finally:
+        conn.close()
+
+def mark_notified(keys, path=STATE_FILE, now=None):
+    """Record that the given (server, email) alerts were contacted"""
+    now = int(now or time.time())
+    conn = connect(path)
+    try:
+        with conn:
+            conn.executemany("UPDATE alerts SET last_notified = ? WHERE server = ? AND email = ?",
+                             [(now, server, email) for server, email in keys])
+    finally:
+        conn.close()
+
+def register_webhooks(urls, path=STATE_FILE, now=None):
+    """Start tracking delivery for new webhook URLs; they only get alerts opened from now on"""
+    now = int(now or time.time())
+    conn = connect(path)
+    try:
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO webhook_targets VALUES (?, ?)", [(url, now) for url in urls])
+    finally:
+        conn.close()
+
+def pending_webhooks(url, path=STATE_FILE):
+    """Open alerts that have not been delivered to this webhook URL yet, oldest first"""
+    if not os.path.exists(path): return []
+    conn = connect(path)
+    try:
+        return [{"Server": server, "User": email, "Status": status, "first_seen": first_seen}
+                for server, email, status, first_seen in conn.execute(
+                    "SELECT a.server, a.email, a.status, a.first_seen FROM alerts a "
+                    "JOIN webhook_targets t ON t.url = ? "
+                    "WHERE a.resolved_at IS NULL AND a.first_seen >= t.added_at AND NOT EXISTS ("
+                    "SELECT 1 FROM webhook_deliveries d WHERE d.server = a.server AND d.email = a.email AND d.url = t.url) "
+                    "ORDER BY a.first_seen", (url,))]
+    finally:
+        conn.close()
+
+def mark_webhook_sent(url, keys, path=STATE_FILE, now=None):
+    now = int(now or time.time())
+    conn = connect(path)
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO webhook_deliveries VALUES (?, ?, ?, ?)",
+                             [(server, email, url, now) for server, email in keys])
+    finally:
+        conn.close()
+
+def history(server, email, path=STATE_FILE):
+    """Status transitions of one client, oldest first"""
+    if not os.path.exists(path): return []
+    conn = connect(path)
+    try:
+        return [{"From": f or "-", "To": t, "At": time.strftime("%Y-%m-%d %H:%M", time.localtime(at))}
+                for f, t, at in conn.execute(
+                    "SELECT from_status, to_status, at FROM transitions WHERE server = ? AND email = ? ORDER BY at",
+                    (server, email))]
+    finally:
+        conn.close()
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Main Entry Point
+#═══════════════════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "history":
+        changes = history(sys.argv[2], sys.argv[3])
+        if not changes:
+            print("No recorded transitions.")
+        for c in changes:
+            print(f"{c['At']}  {c['From']:<14} -> {c['To']}")
+    else:
+        print("Usage:")
+        print("  python3 alert_state.py history <server> <email>")
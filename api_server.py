@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+X-UI Monitor - JSON API & Webhooks
+Small token-protected HTTP API next to the dashboard, serving the latest scan
+snapshot written by main.py (latest_scan.json.gz), plus outbound webhooks for
+alerts that have not been delivered yet.
+
+    XUI_API_TOKEN=secret XUI_WEBHOOK_SECRET=other python3 api_server.py --port 8502 \
+        --webhook https://billing.example/xui-hook
+
+Endpoints (all need "Authorization: Bearer <token>"):
+    GET /api/snapshot            every alert row of the latest scan
+    GET /api/servers             per-server status and alert counts
+    GET /api/lookup?q=<query>    client lookup (email prefix or phone)
+    GET /api/health              liveness, no auth
+"""
+
+import argparse
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+import alert_state
+import client_index
+from result_store import LATEST_FILE
+
+DEFAULT_PORT = 8502
+WEBHOOK_POLL_SECONDS = 10
+WEBHOOK_RETRIES = 3
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Snapshot Cache
+#═══════════════════════════════════════════════════════════════════════════════
+
+class SnapshotCache:
+    """
+    Re-reads latest_scan.json.gz only when it changes, and keeps the encoded
+    responses (plain + gzip) with their ETags so polling is just a stat call.
+    """
+
+    def __init__(self, path=LATEST_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self.snapshot = None
+        self.responses = {}
+
+    def refresh(self):
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stamp = (info.st_mtime_ns, info.st_size)
+        with self._lock:
+            if stamp != self._stamp:
+                with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                self.responses = {
+                    "snapshot": _encode({"generated_at": snapshot["generated_at"], "rows": snapshot["rows"]}),
+                    "servers": _encode({"generated_at": snapshot["generated_at"], "servers": snapshot["servers"]}),
+                }
+                self.snapshot = snapshot
+                self._stamp = stamp
+            return self.snapshot
+
+    def response(self, name):
+        if self.refresh() is None: return None
+        with self._lock:
+            return self.responses.get(name)
+
+
+def _encode(payload):
+    """(body, gzipped body, etag) for a JSON payload"""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    return body, gzip.compress(body, compresslevel=6), etag
+
+#═══════════════════════════════════════════════════════════════════════════════
+# HTTP API
+#═══════════════════════════════════════════════════════════════════════════════
+
+def make_handler(token, cache):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            sys.stderr.write(f"[api] {self.address_string()} {fmt % args}\n")
+
+        def _send(self, status, body, etag=None, gzipped=None):
+            use_gzip = gzipped is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+            payload = gzipped if use_gzip else body
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            if etag: self.send_header("ETag", etag)
+            if use_gzip: self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _json(self, status, payload):
+            self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+        def _cached(self, name):
+            cached = cache.response(name)
+            if cached is None:
+                return self._json(503, {"success": False, "msg": "no scan yet"})
+            body, gzipped, etag = cached
+            if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send(200, body, etag, gzipped)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/api/health":
+                return self._json(200, {"success": True})
+
+            auth = self.headers.get("Authorization", "")
+            if not hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+                return self._json(401, {"success": False, "msg": "bad token"})
+
+            if url.path == "/api/snapshot":
+                return self._cached("snapshot")
+            if url.path == "/api/servers":
+                return self._cached("servers")
+            if url.path == "/api/lookup":
+                query = parse_qs(url.query).get("q", [""])[0]
+                return self._json(200, {"success": True, "matches": client_index.lookup(query)})
+            self._json(404, {"success": False, "msg": "not found"})
+
+    return Handler
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Webhooks
+#═══════════════════════════════════════════════════════════════════════════════
+
+def post_webhook(url, body, secret, timeout=10):
+    """POST with an HMAC-SHA256 signature of the body; retried with backoff"""
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    headers = {"Content-Type": "application/json", "X-XUI-Signature": f"sha256={signature}"}
+    for attempt in range(WEBHOOK_RETRIES):
+        try:
+            res = requests.post(url, data=body, headers=headers, timeout=timeout)
+            if res.status_code < 500: return res.status_code
+        except requests.RequestException:
+            pass
+        time.sleep(2 ** attempt)
+    return None
+
+def webhook_loop(cache, urls, secret, poll=WEBHOOK_POLL_SECONDS):
+    """
+    Send every alert that alert_state opened (or re-opened) once to each webhook
+    URL. Delivery is tracked per (server, email, url) in alert_state.db and only
+    a 2xx answer counts, so a URL that is down gets its alerts on a later poll,
+    while rescans of other servers and restarts never resend an alert.
+    """
+    alert_state.register_webhooks(urls)
+    while True:
+        try:
+            snapshot = cache.refresh()
+            # Only alerts the dashboard shows; the rest stay pending until a scan displays them
+            details = {(r["Server"], r["User"]): r for r in snapshot["rows"]} if snapshot else {}
+            for url in urls:
+                # Wait until the snapshot of the scan that opened the alert is written, for its details
+                pending = [p for p in alert_state.pending_webhooks(url)
+                           if p["first_seen"] <= snapshot["generated_at"] and (p["Server"], p["User"]) in details]
+                if not pending: continue
+                alerts = []
+                for p in pending:
+                    alert = dict(details[(p["Server"], p["User"])])
+                    alert.pop("State", None)
+                    alerts.append(dict(alert, Status=p["Status"]))
+                body = json.dumps({"event": "new_alerts", "generated_at": snapshot["generated_at"],
+                                   "alerts": alerts}, ensure_ascii=False).encode("utf-8")
+                status = post_webhook(url, body, secret)
+                print(f"[webhook] {url} <- {len(alerts)} alerts ({status or 'failed'})")
+                if status and 200 <= status < 300:
+                    alert_state.mark_webhook_sent(url, [(p["Server"], p["User"]) for p in pending])
+        except Exception as e:
+            print(f"[webhook] error: {e}")
+        time.sleep(poll)
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Main Entry Point
+#═══════════════════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="X-UI Monitor JSON API")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--token", default=os.environ.get("XUI_API_TOKEN"))
+    parser.add_argument("--webhook", action="append", default=[],
+                        help="URL to POST new alerts to (repeatable, or XUI_WEBHOOKS=url1,url2)")
+    parser.add_argument("--webhook-secret", default=os.environ.get("XUI_WEBHOOK_SECRET"),
+                        help="HMAC key for X-XUI-Signature (or XUI_WEBHOOK_SECRET); not the API token")
+    args = parser.parse_args()
+
+    if not args.token:
+        print("An API token is required (--token or XUI_API_TOKEN)")
+        sys.exit(1)
+
+    urls = args.webhook + [u for u in os.environ.get("XUI_WEBHOOKS", "").split(",") if u.strip()]
+    if urls and not args.webhook_secret:
+        print("Webhooks need their own signing secret (--webhook-secret or XUI_WEBHOOK_SECRET)")
+        sys.exit(1)
+    if urls and hmac.compare_digest(args.webhook_secret.encode(), args.token.encode()):
+        print("The webhook secret must differ from the API token")
+        sys.exit(1)
+
+    cache = SnapshotCache()
+    if urls:
+        threading.Thread(target=webhook_loop, args=(cache, urls, args.webhook_secret), daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.token, cache))
+    print(f"X-UI Monitor API on {args.host}:{args.port}" + (f", {len(urls)} webhook(s)" if urls else ""))
+    server.serve_forever()
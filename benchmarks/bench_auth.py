@@ -0,0 +1,69 @@
+"""
+Per-rerun auth config overhead: re-parsing auth_config.yaml on every Streamlit
+rerun (old behaviour) vs an mtime/size check plus a cached copy (what
+st.cache_data hands back, approximated here with a pickle round trip).
+
+    python3 benchmarks/bench_auth.py --users 50 --reruns 2000
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+from yaml.loader import SafeLoader
+
+import admin_manager
+
+
+def make_config(users):
+    fake_hash = "$2b$12$" + "x" * 53
+    return {
+        "credentials": {"usernames": {
+            f"admin{i}": {"email": f"admin{i}@example.com", "name": f"Admin {i}", "password": fake_hash}
+            for i in range(users)
+        }},
+        "cookie": {"expiry_days": 30, "key": "bench", "name": "xui_monitor_cookie"},
+        "preauthorized": {"emails": []},
+    }
+
+
+def timed(label, fn, reruns):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        fn()
+    per = (time.perf_counter() - start) / reruns
+    print(f"{label:<28} {per * 1e6:10.1f} µs / rerun")
+    return per
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark auth config loading per rerun")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--reruns", type=int, default=1000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "auth_config.yaml")
+    with open(path, "w") as f:
+        yaml.dump(make_config(args.users), f, default_flow_style=False)
+
+    def before():
+        with open(path) as file:
+            yaml.load(file, Loader=SafeLoader)
+
+    cache = {}
+    def after():
+        stamp = admin_manager.config_stamp(path)
+        if stamp not in cache:
+            cache.clear()
+            cache[stamp] = pickle.dumps(admin_manager.read_config(path))
+        pickle.loads(cache[stamp])
+
+    old = timed("yaml parse every rerun", before, args.reruns)
+    new = timed("stat + cached copy", after, args.reruns)
+    print(f"speedup: {old / new:.1f}x")
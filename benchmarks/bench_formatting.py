@@ -0,0 +1,62 @@
+"""
+Micro-benchmark of Jalali date / time-remaining formatting.
+
+Compares the original per-call implementation with the day-cached to_jalali
+and the vectorized *_series helpers over N expiry timestamps.
+
+    python3 benchmarks/bench_formatting.py --n 100000 --days 120
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jdatetime
+
+from formatting import DAY_SECONDS, format_time_remaining, jalali_series, time_remaining_series, to_jalali
+
+
+def to_jalali_uncached(timestamp_ms):
+    """The pre-cache implementation, kept here as the baseline"""
+    try:
+        if timestamp_ms <= 0: return "-"
+        dt = datetime.fromtimestamp(timestamp_ms / 1000)
+        jalali_date = jdatetime.date.fromgregorian(date=dt.date())
+        return jalali_date.strftime("%Y/%m/%d")
+    except:
+        return "-"
+
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms   {n / elapsed:12,.0f} /s")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark date formatting")
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=120, help="spread of expiry days around now")
+    args = parser.parse_args()
+
+    now_ms = int(time.time() * 1000)
+    rnd = random.Random(42)
+    stamps = [now_ms + rnd.randint(-args.days // 2, args.days // 2) * DAY_SECONDS * 1000 + rnd.randint(0, DAY_SECONDS * 1000)
+              for _ in range(args.n)]
+    days_left = [(t - now_ms) / (1000 * DAY_SECONDS) for t in stamps]
+
+    base = timed("to_jalali (uncached baseline)", lambda: [to_jalali_uncached(t) for t in stamps], args.n)
+    cached = timed("to_jalali (day LRU)", lambda: [to_jalali(t) for t in stamps], args.n)
+    vector = timed("jalali_series (vectorized)", lambda: jalali_series(stamps), args.n)
+    assert base == cached == list(vector), "Jalali outputs differ"
+
+    rem = timed("format_time_remaining", lambda: [format_time_remaining(d) for d in days_left], args.n)
+    rem_vec = timed("time_remaining_series (vectorized)", lambda: time_remaining_series(days_left), args.n)
+    assert rem == list(rem_vec), "time remaining outputs differ"
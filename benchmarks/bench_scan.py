@@ -0,0 +1,164 @@
+"""
+End-to-end scan benchmark against local stub X-UI panels.
+
+Fetches every stub panel and classifies it with extract_metrics ->
+classify_metrics, the pipeline the scan jobs use (--pipeline legacy times
+process_clients instead), and reports wall time, throughput, peak memory and
+per-phase timings. Peak memory is measured in a separate untimed pass, and
+another untimed pass asserts both pipelines produce the same rows. Pass
+--json to get a machine-readable line that can be appended to a history file
+to track regressions.
+
+    python3 benchmarks/bench_scan.py --servers 20 --clients 2000 --latency 0.05 --fail-rate 0.05
+    python3 benchmarks/bench_scan.py --recording 20260101-120000   # serve a recorded scan
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_panel import VARIANT_PATHS, start_stub
+from recorder import load_recording
+from scanner import classify_metrics, extract_metrics, process_clients
+from transport import get_transport
+
+
+def count_clients(inbounds):
+    total = 0
+    for inbound in inbounds:
+        settings = inbound.get('settings') or {}
+        if isinstance(settings, str): settings = json.loads(settings)
+        total += len(settings.get('clients', []))
+    return total
+
+
+def classify(server_name, inbounds, pipeline, warning_days, warning_gb, hide_days, debug):
+    if pipeline == "metrics":
+        metrics = extract_metrics(inbounds)
+        return classify_metrics(server_name, metrics, warning_days, warning_gb, hide_days, debug=debug)
+    return process_clients(server_name, inbounds, warning_days, warning_gb, hide_days, debug=debug)
+
+
+def run_scan(transport, servers, warning_days=3, warning_gb=2.0, hide_days=7, debug=False, pipeline="metrics"):
+    """Scan all servers; returns (stats dict, alert rows). Peak memory comes from a separate untimed pass."""
+    phases = {"fetch": 0.0, "process": 0.0}
+    all_data = []
+    fetched = []
+    failed = 0
+
+    start = time.perf_counter()
+    mark = start
+    for s, inbounds in transport.fetch_many(servers):
+        now = time.perf_counter()
+        phases["fetch"] += now - mark
+        if inbounds:
+            all_data.extend(classify(s['name'], inbounds, pipeline, warning_days, warning_gb, hide_days, debug))
+            phases["process"] += time.perf_counter() - now
+            fetched.append(inbounds)
+        else:
+            failed += 1
+        mark = time.perf_counter()
+    wall = time.perf_counter() - start
+
+    # Counted after the clock stops (the async transport keeps fetching while we classify)
+    clients = sum(count_clients(inbounds) for inbounds in fetched)
+    stats = {
+        "transport": transport.name,
+        "pipeline": pipeline,
+        "servers": len(servers),
+        "failed": failed,
+        "clients": clients,
+        "alerts": len(all_data),
+        "wall_s": round(wall, 4),
+        "clients_per_s": round(clients / wall, 1) if wall else 0,
+        "peak_mem_mb": peak_memory(transport, servers, warning_days, warning_gb, hide_days, debug, pipeline),
+        "fetch_s": round(phases["fetch"], 4),
+        "other_s": round(wall - phases["fetch"] - phases["process"], 4),
+        "process_s": round(phases["process"], 4),
+    }
+    return stats, all_data
+
+
+def peak_memory(transport, servers, warning_days=3, warning_gb=2.0, hide_days=7, debug=False, pipeline="metrics"):
+    """Untimed rerun of the scan under tracemalloc, which would otherwise slow the timed run; peak MB"""
+    tracemalloc.start()
+    try:
+        for s, inbounds in transport.fetch_many(servers):
+            if inbounds: classify(s['name'], inbounds, pipeline, warning_days, warning_gb, hide_days, debug)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 2)
+
+
+def verify_pipelines(transport, servers, warning_days=3, warning_gb=2.0, hide_days=7, debug=False):
+    """Untimed: assert classify_metrics returns exactly the process_clients rows for every panel"""
+    checked = 0
+    for s, inbounds in transport.fetch_many(servers):
+        if not inbounds: continue
+        metrics = extract_metrics(inbounds)
+        legacy = process_clients(s['name'], inbounds, warning_days, warning_gb, hide_days,
+                                 debug=debug, now_ms=metrics["scanned_at"])
+        rows = classify_metrics(s['name'], metrics, warning_days, warning_gb, hide_days, debug=debug)
+        assert rows == legacy, f"metrics pipeline differs from process_clients on {s['name']}"
+        checked += len(metrics["email"])
+    return checked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the full scan pipeline")
+    parser.add_argument("--servers", type=int, default=10)
+    parser.add_argument("--clients", type=int, default=2000, help="clients per panel")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per panel request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="probability of a 500 per request")
+    parser.add_argument("--variant", choices=sorted(VARIANT_PATHS) + ["mixed"], default="mixed")
+    parser.add_argument("--transport", default=None, help="requests or async (default: $XUI_TRANSPORT)")
+    parser.add_argument("--debug", action="store_true", help="include every client like Debug Mode")
+    parser.add_argument("--pipeline", choices=["metrics", "legacy"], default="metrics",
+                        help="metrics = extract_metrics/classify_metrics (live), legacy = process_clients")
+    parser.add_argument("--json", action="store_true", help="print a single JSON result line")
+    parser.add_argument("--recording", help="serve the payloads of a recorded scan (see recorder.py)")
+    args = parser.parse_args()
+
+    variants = sorted(VARIANT_PATHS)
+    if args.recording:
+        recorded = list(load_recording(args.recording))
+        stubs = [start_stub(body=inbounds, latency=args.latency, fail_rate=args.fail_rate) for _, inbounds, _ in recorded]
+        names = [name for name, _, _ in recorded]
+    else:
+        stubs = [
+            start_stub(clients=args.clients, latency=args.latency, fail_rate=args.fail_rate,
+                       variant=variants[i % len(variants)] if args.variant == "mixed" else args.variant)
+            for i in range(args.servers)
+        ]
+        names = [f"stub-{i}" for i in range(args.servers)]
+    servers = [
+        {"name": name, "url": f"http://127.0.0.1:{s.server_port}", "username": "admin", "password": "admin"}
+        for name, s in zip(names, stubs)
+    ]
+
+    transport = get_transport(args.transport)
+    stats, _ = run_scan(transport, servers, debug=args.debug, pipeline=args.pipeline)
+    stats["verified_clients"] = verify_pipelines(transport, servers, debug=args.debug)
+    transport.close()
+    for s in stubs:
+        s.shutdown()
+
+    if args.json:
+        print(json.dumps(stats))
+    else:
+        print(f"Transport      : {stats['transport']} ({stats['pipeline']} pipeline)")
+        print(f"Servers        : {stats['servers']} ({stats['failed']} failed)")
+        print(f"Clients        : {stats['clients']} -> {stats['alerts']} alerts")
+        print(f"Wall time      : {stats['wall_s']:.3f}s")
+        print(f"Throughput     : {stats['clients_per_s']:.0f} clients/s")
+        print(f"Peak memory    : {stats['peak_mem_mb']:.1f} MB")
+        print(f"  fetch        : {stats['fetch_s']:.3f}s")
+        print(f"  process      : {stats['process_s']:.3f}s")
+        print(f"  other        : {stats['other_s']:.3f}s")
+        print(f"Verified       : {stats['verified_clients']} clients, metrics rows == process_clients rows")
@@ -0,0 +1,53 @@
+"""
+Compare the requests and httpx transports against local stub panels.
+
+    python3 benchmarks/bench_transport.py --servers 20 --clients 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_panel import start_stub
+from transport import RequestsTransport, HttpxTransport, httpx
+
+
+def run(transport, servers):
+    start = time.perf_counter()
+    ok = sum(1 for _, inbounds in transport.fetch_many(servers) if inbounds)
+    elapsed = time.perf_counter() - start
+    transport.close()
+    return ok, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark panel transports")
+    parser.add_argument("--servers", type=int, default=10)
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    stubs = [start_stub(clients=args.clients) for _ in range(args.servers)]
+    servers = [
+        {"name": f"stub-{i}", "url": f"http://127.0.0.1:{s.server_port}", "username": "admin", "password": "admin"}
+        for i, s in enumerate(stubs)
+    ]
+
+    backends = [("requests", RequestsTransport)]
+    if httpx is not None:
+        backends.append(("async", HttpxTransport))
+    else:
+        print("httpx not installed, skipping async backend")
+
+    for label, cls in backends:
+        timings = []
+        for _ in range(args.rounds):
+            ok, elapsed = run(cls(), servers)
+            timings.append(elapsed)
+        print(f"{label:<10} {ok}/{len(servers)} ok   best {min(timings):.3f}s   avg {sum(timings) / len(timings):.3f}s")
+
+    for s in stubs:
+        s.shutdown()
@@ -0,0 +1,134 @@
+"""
+Minimal local stand-in for an X-UI panel, used for benchmarking.
+
+Serves /login and the inbound list of one panel flavour with a generated
+inbound list, and gzip-compresses responses when the client asks for it.
+
+Variants:
+  panel  - /panel/api/inbounds/list (Sanaei 3x-ui)
+  xui    - /xui/API/inbounds (older Alireza / vaxilu builds)
+
+    python3 benchmarks/stub_panel.py --port 9001 --clients 5000 --latency 0.05 --fail-rate 0.1
+"""
+
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GB = 1024 * 1024 * 1024
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def build_inbounds(clients=1000, inbounds=4):
+    """Generate a realistic-looking inbound list with `clients` clients in total"""
+    now_ms = int(time.time() * 1000)
+    per_inbound = max(1, clients // inbounds)
+    result = []
+    n = 0
+    for i in range(inbounds):
+        client_list, stats = [], []
+        for _ in range(per_inbound):
+            email = f"user_0912{n:07d}"
+            client_list.append({
+                "id": f"00000000-0000-0000-0000-{n:012d}",
+                "email": email,
+                "enable": n % 17 != 0,
+                "totalGB": (n % 5) * 10 * GB,
+                "expiryTime": now_ms + ((n % 60) - 10) * DAY_MS if n % 7 else 0,
+            })
+            stats.append({"email": email, "up": (n % 13) * GB, "down": (n % 29) * GB})
+            n += 1
+        result.append({
+            "id": i + 1,
+            "remark": f"inbound-{i + 1}",
+            "settings": json.dumps({"clients": client_list}),
+            "clientStats": stats,
+        })
+    return result
+
+
+VARIANT_PATHS = {
+    "panel": ("/panel/api/inbounds/list",),
+    "xui": ("/xui/API/inbounds", "/xui/API/inbounds/"),
+}
+
+
+def make_handler(body, variant="panel", latency=0.0, fail_rate=0.0):
+    """
+    Build a request handler serving `body` as the inbound list.
+
+    latency   - seconds slept before every response
+    fail_rate - probability (0..1) that a request answers 500 instead
+    """
+    raw = json.dumps({"success": True, "msg": "", "obj": body}).encode()
+    compressed = gzip.compress(raw)
+    list_paths = VARIANT_PATHS[variant]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload, headers=None):
+            if latency: time.sleep(latency)
+            if fail_rate and random.random() < fail_rate:
+                status, payload, headers = 500, b"{}", None
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            if self.path == "/login":
+                self._send(200, b'{"success": true}', {"Set-Cookie": "session=stub; Path=/"})
+            elif "/updateClient/" in self.path or "/resetClientTraffic/" in self.path:
+                self._send(200, b'{"success": true, "msg": "ok"}')
+            else:
+                self._send(404, b"{}")
+
+        def do_GET(self):
+            if self.path not in list_paths:
+                self._send(404, b"{}")
+            elif "gzip" in self.headers.get("Accept-Encoding", ""):
+                self._send(200, compressed, {"Content-Encoding": "gzip"})
+            else:
+                self._send(200, raw)
+
+    return Handler
+
+
+def start_stub(port=0, clients=1000, inbounds=4, variant="panel", latency=0.0, fail_rate=0.0, body=None):
+    """
+    Start a stub panel on a background thread; returns the server (server.server_port).
+    `body` serves a given inbound list (e.g. a recorded one) instead of generated clients.
+    """
+    if body is None: body = build_inbounds(clients, inbounds)
+    handler = make_handler(body, variant, latency, fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub X-UI panel")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--inbounds", type=int, default=4)
+    parser.add_argument("--variant", choices=sorted(VARIANT_PATHS), default="panel")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    handler = make_handler(build_inbounds(args.clients, args.inbounds), args.variant, args.latency, args.fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    print(f"Stub X-UI panel ({args.variant}) on http://127.0.0.1:{args.port} ({args.clients} clients)")
+    server.serve_forever()
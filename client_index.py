@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+X-UI Monitor - Cross-Panel Client Index
+Persistent SQLite index of every client seen during scans:
+email / phone -> (server, inbound, status)
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from scanner import STATUS_LABELS, classify_codes, extract_core_phone
+
+INDEX_FILE = "client_index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    server     TEXT NOT NULL,
+    inbound    TEXT NOT NULL,
+    email      TEXT NOT NULL,
+    email_lc   TEXT NOT NULL,
+    phone      TEXT,
+    enabled    INTEGER NOT NULL,
+    status     TEXT NOT NULL,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (server, inbound, email)
+);
+CREATE INDEX IF NOT EXISTS idx_clients_email ON clients (email_lc);
+CREATE INDEX IF NOT EXISTS idx_clients_phone ON clients (phone);
+"""
+
+def connect(path=INDEX_FILE):
+    conn = sqlite3.connect(path, timeout=10)
+    conn.executescript(SCHEMA)
+    return conn
+
+def update_server(server_name, metrics, warning_days, warning_gb, path=INDEX_FILE):
+    """
+    Replace the indexed clients of one server with the latest scan (metrics from
+    scanner.extract_metrics). Status comes from the unfiltered classification, so
+    zombies and clients Debug Mode hides are indexed with their real status.
+    """
+    codes, _ = classify_codes(metrics, warning_days, warning_gb, 0)
+    now = int(time.time())
+    rows = []
+    for email, label, enabled, code in zip(metrics['email'], metrics['inbound'],
+                                           metrics['enabled'].tolist(), codes.tolist()):
+        status = STATUS_LABELS[code] if enabled else "Disabled"
+        rows.append((server_name, label, email, email.lower(), extract_core_phone(email),
+                     int(enabled), status, now))
+
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM clients WHERE server = ?", (server_name,))
+            conn.executemany("INSERT OR REPLACE INTO clients VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    finally:
+        conn.close()
+    return len(rows)
+
+def remove_server(server_name, path=INDEX_FILE):
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM clients WHERE server = ?", (server_name,))
+    finally:
+        conn.close()
+
+def normalize_phone_query(query):
+    """
+    Turn a (partial) phone number into the core form used by extract_core_phone:
+    +98 912 ..., 0098912..., 0912... and 912... all become 912...
+    Returns None if the query doesn't look like a phone number.
+    """
+    digits = re.sub(r'\D', '', query)
+    if not digits or re.search(r'[A-Za-z]', query): return None
+    for prefix in ("0098", "98", "0"):
+        if digits.startswith(prefix) and digits[len(prefix):].startswith("9"):
+            digits = digits[len(prefix):]
+            break
+    if not digits.startswith("9"): return None
+    return digits
+
+def _like_prefix(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def lookup(query, limit=50, servers=None, path=INDEX_FILE):
+    """Find clients by email prefix or (normalized) phone prefix, optionally only on `servers`"""
+    query = (query or "").strip()
+    if not query or not os.path.exists(path): return []
+    if servers is not None and not servers: return []
+
+    phone = normalize_phone_query(query)
+    if phone:
+        where = "(phone LIKE ? ESCAPE '\\' OR email_lc LIKE ? ESCAPE '\\')"
+        params = [_like_prefix(phone), _like_prefix(query.lower())]
+    else:
+        where = "email_lc LIKE ? ESCAPE '\\'"
+        params = [_like_prefix(query.lower())]
+    if servers is not None:
+        where += f" AND server IN ({','.join('?' * len(servers))})"
+        params.extend(servers)
+
+    conn = connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        cur = conn.execute(f"SELECT * FROM clients WHERE {where} ORDER BY email_lc LIMIT ?", (*params, limit))
+        return [{
+            "User": r['email'], "Phone": r['phone'] or "-", "Server": r['server'],
+            "Inbound": r['inbound'], "Status": r['status'],
+            "Updated": time.strftime("%Y-%m-%d %H:%M", time.localtime(r['updated_at'])),
+        } for r in cur]
+    finally:
+        conn.close()
+
+def index_stats(path=INDEX_FILE):
+    if not os.path.exists(path): return {"clients": 0, "servers": 0}
+    conn = connect(path)
+    try:
+        clients, servers = conn.execute("SELECT COUNT(*), COUNT(DISTINCT server) FROM clients").fetchone()
+        return {"clients": clients, "servers": servers}
+    finally:
+        conn.close()
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Main Entry Point
+#═══════════════════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "find":
+        matches = lookup(sys.argv[2])
+        if not matches:
+            print("No matching clients.")
+        for m in matches:
+            print(f"{m['User']:<32} {m['Phone']:<12} {m['Server']:<20} {m['Inbound']:<16} {m['Status']}  ({m['Updated']})")
+    elif len(sys.argv) == 2 and sys.argv[1] == "stats":
+        s = index_stats()
+        print(f"{s['clients']} clients indexed across {s['servers']} servers")
+    else:
+        print("Usage:")
+        print("  python3 client_index.py find <email-prefix | phone>")
+        print("  python3 client_index.py stats")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+X-UI Monitor - Sharded Collector
+Lets several monitor nodes split the server registry between them.
+
+Every node owns the servers that consistent hashing assigns to it, scans only
+those, and pushes a gzip-compressed snapshot of the results to the primary
+node, which stores the latest snapshot per node for the dashboard to merge.
+
+    # primary (next to the dashboard)
+    python3 collector.py serve --port 8600 --token SECRET
+
+    # each region
+    python3 collector.py collect --node eu --nodes eu,ir,us \
+        --primary http://primary:8600 --token SECRET --interval 300
+"""
+
+import argparse
+import bisect
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import re
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from scanner import classify_metrics, extract_metrics, metrics_to_json
+from transport import get_transport
+from utils import load_servers, load_settings
+
+SNAPSHOT_DIR = "snapshots"
+DEFAULT_PORT = 8600
+RING_REPLICAS = 100
+MAX_SNAPSHOT_BYTES = 64 * 1024 * 1024
+NODE_NAME_PATTERN = r'^[a-zA-Z0-9_-]+$'
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Consistent Hashing
+#═══════════════════════════════════════════════════════════════════════════════
+
+def _hash(value):
+    return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+class HashRing:
+    """Consistent hash ring; adding or removing a node only moves that node's servers"""
+
+    def __init__(self, nodes, replicas=RING_REPLICAS):
+        self.ring = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self.keys = [k for k, _ in self.ring]
+
+    def owner(self, server_name):
+        if not self.ring: return None
+        idx = bisect.bisect(self.keys, _hash(server_name)) % len(self.ring)
+        return self.ring[idx][1]
+
+def shard_servers(servers, node, nodes):
+    ring = HashRing(nodes)
+    return [s for s in servers if ring.owner(s['name']) == node]
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Collector Side
+#═══════════════════════════════════════════════════════════════════════════════
+
+def scan_shard(servers, filters, transport=None):
+    """Scan the given servers and return the per-server snapshot blocks (alert rows + raw metrics)"""
+    transport = transport or get_transport()
+    result = {}
+    for s, inbounds in transport.fetch_many(servers):
+        block = {"ok": bool(inbounds), "scanned_at": int(time.time()), "rows": []}
+        if inbounds:
+            # Raw metrics travel along so the primary tracks alerts and indexes clients like a local scan
+            metrics = extract_metrics(inbounds)
+            block["rows"] = classify_metrics(s['name'], metrics, filters['days'], filters['gb'],
+                                             filters['hide'], debug=filters.get('debug', False))
+            block["metrics"] = metrics_to_json(metrics)
+        result[s['name']] = block
+    return result
+
+def build_snapshot(node, nodes, transport=None):
+    servers = shard_servers(load_servers(), node, nodes)
+    filters = load_settings()['filters']
+    return {"node": node, "nodes": list(nodes), "created_at": int(time.time()),
+            "servers": scan_shard(servers, filters, transport)}
+
+def push_snapshot(snapshot, primary_url, token, timeout=30):
+    body = gzip.compress(json.dumps(snapshot, ensure_ascii=False).encode("utf-8"))
+    res = requests.post(f"{primary_url.rstrip('/')}/snapshot", data=body, timeout=timeout, headers={
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+        "Content-Encoding": "gzip",
+    })
+    res.raise_for_status()
+    return len(body)
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Primary Side
+#═══════════════════════════════════════════════════════════════════════════════
+
+def store_snapshot(raw_gzip, snapshot_dir=SNAPSHOT_DIR):
+    """Validate a pushed snapshot and atomically replace the node's previous one"""
+    snapshot = json.loads(gzip.decompress(raw_gzip))
+    node = str(snapshot.get("node", ""))
+    if not re.match(NODE_NAME_PATTERN, node) or not isinstance(snapshot.get("servers"), dict):
+        raise ValueError("invalid snapshot")
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, f"{node}.json.gz")
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw_gzip)
+    os.replace(tmp, path)
+    return node
+
+def has_snapshots(snapshot_dir=SNAPSHOT_DIR):
+    return os.path.isdir(snapshot_dir) and any(n.endswith(".json.gz") for n in os.listdir(snapshot_dir))
+
+def load_snapshots(snapshot_dir=SNAPSHOT_DIR):
+    if not os.path.isdir(snapshot_dir): return []
+    snapshots = []
+    for name in sorted(os.listdir(snapshot_dir)):
+        if not name.endswith(".json.gz"): continue
+        try:
+            with gzip.open(os.path.join(snapshot_dir, name), "rt", encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except: pass
+    return snapshots
+
+def merge_snapshot_blocks(snapshots):
+    """
+    Merge node snapshots into ({server: block}, nodes_meta).
+    If two nodes report the same server (e.g. during a re-shard) the newest scan wins.
+    """
+    latest = {}
+    meta = []
+    for snap in snapshots:
+        meta.append({"Node": snap.get("node"), "Servers": len(snap.get("servers", {})),
+                     "Pushed": time.strftime("%Y-%m-%d %H:%M", time.localtime(snap.get("created_at", 0)))})
+        for name, block in snap.get("servers", {}).items():
+            if name not in latest or block.get("scanned_at", 0) > latest[name].get("scanned_at", 0):
+                latest[name] = block
+    return latest, meta
+
+def make_handler(token, snapshot_dir):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            sys.stderr.write(f"[collector] {self.address_string()} {fmt % args}\n")
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path != "/snapshot":
+                return self._reply(404, {"success": False})
+            auth = self.headers.get("Authorization", "")
+            if not hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+                return self._reply(401, {"success": False, "msg": "bad token"})
+            length = int(self.headers.get("Content-Length", 0))
+            if length <= 0 or length > MAX_SNAPSHOT_BYTES:
+                return self._reply(413, {"success": False, "msg": "bad size"})
+            try:
+                node = store_snapshot(self.rfile.read(length), snapshot_dir)
+            except Exception as e:
+                return self._reply(400, {"success": False, "msg": str(e)})
+            self._reply(200, {"success": True, "node": node})
+
+    return Handler
+
+def serve(port, token, snapshot_dir=SNAPSHOT_DIR, host="0.0.0.0"):
+    server = ThreadingHTTPServer((host, port), make_handler(token, snapshot_dir))
+    print(f"Collector primary listening on {host}:{port}, storing snapshots in {snapshot_dir}/")
+    server.serve_forever()
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Main Entry Point
+#═══════════════════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="X-UI Monitor sharded collector")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p_serve = sub.add_parser("serve", help="receive snapshots (primary node)")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--host", default="0.0.0.0")
+    p_serve.add_argument("--dir", default=SNAPSHOT_DIR)
+
+    p_collect = sub.add_parser("collect", help="scan this node's shard and push it")
+    p_collect.add_argument("--node", required=True)
+    p_collect.add_argument("--nodes", required=True, help="comma separated list of all node names")
+    p_collect.add_argument("--primary", required=True, help="primary URL, e.g. http://10.0.0.1:8600")
+    p_collect.add_argument("--interval", type=int, default=0, help="seconds between scans (0 = run once)")
+
+    p_shards = sub.add_parser("shards", help="show which node owns each server")
+    p_shards.add_argument("--nodes", required=True)
+
+    for p in (p_serve, p_collect):
+        p.add_argument("--token", default=os.environ.get("XUI_COLLECTOR_TOKEN"))
+    args = parser.parse_args()
+
+    if args.mode == "shards":
+        ring = HashRing(args.nodes.split(","))
+        for s in load_servers():
+            print(f"{s['name']:<30} -> {ring.owner(s['name'])}")
+        sys.exit(0)
+
+    if not args.token:
+        print("A shared token is required (--token or XUI_COLLECTOR_TOKEN)")
+        sys.exit(1)
+
+    if args.mode == "serve":
+        serve(args.port, args.token, args.dir, args.host)
+    else:
+        nodes = [n.strip() for n in args.nodes.split(",") if n.strip()]
+        if args.node not in nodes:
+            print(f"Node '{args.node}' is not in --nodes")
+            sys.exit(1)
+        while True:
+            start = time.time()
+            try:
+                snapshot = build_snapshot(args.node, nodes)
+                size = push_snapshot(snapshot, args.primary, args.token)
+                print(f"Pushed {len(snapshot['servers'])} servers ({size} bytes) in {time.time() - start:.1f}s")
+            except Exception as e:
+                print(f"Collect failed: {e}")
+            if not args.interval: break
+            time.sleep(max(0, args.interval - (time.time() - start)))
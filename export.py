@@ -0,0 +1,93 @@
+"""
+X-UI Monitor - Scan Result Export
+Writes scan rows to CSV or Parquet incrementally (row by row / batch by batch)
+into a temporary file, so large debug inventories never become one big string.
+"""
+
+import csv
+import io
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+EXPORT_COLUMNS = ["Server", "InboundId", "User", "Status", "Rem", "Time", "ExpDate"]
+PARQUET_BATCH = 5000
+
+# Spill to disk once the export grows past this many bytes
+SPOOL_LIMIT = 8 * 1024 * 1024
+
+
+def export_formats():
+    return ["csv", "parquet"] if pa is not None else ["csv"]
+
+
+def iter_csv_chunks(rows, columns=EXPORT_COLUMNS, chunk_rows=1000):
+    """Yield the CSV as encoded chunks of `chunk_rows` rows"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for i, row in enumerate(rows, 1):
+        writer.writerow([row.get(c, "") for c in columns])
+        if i % chunk_rows == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def write_csv(rows, fileobj, columns=EXPORT_COLUMNS):
+    fileobj.write(b"\xef\xbb\xbf")  # BOM so Excel shows Persian dates correctly
+    for chunk in iter_csv_chunks(rows, columns):
+        fileobj.write(chunk)
+
+
+def write_parquet(rows, fileobj, columns=EXPORT_COLUMNS, batch_size=PARQUET_BATCH):
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    schema = pa.schema([(c, pa.int64() if c == "InboundId" else pa.string()) for c in columns])
+    writer = pq.ParquetWriter(fileobj, schema, compression="zstd")
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_table(_to_table(batch, schema))
+                batch = []
+        if batch:
+            writer.write_table(_to_table(batch, schema))
+    finally:
+        writer.close()
+
+
+def _to_table(batch, schema):
+    arrays = []
+    for field in schema:
+        if field.name == "InboundId":
+            values = [_to_int(r.get("InboundId")) for r in batch]
+        else:
+            values = [None if r.get(field.name) is None else str(r.get(field.name)) for r in batch]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def export_rows(rows, fmt="csv"):
+    """Write rows to a spooled temp file and return it rewound, ready to read"""
+    tmp = tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT)
+    if fmt == "parquet":
+        write_parquet(rows, tmp)
+    else:
+        write_csv(rows, tmp)
+    tmp.seek(0)
+    return tmp
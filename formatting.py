@@ -0,0 +1,86 @@
+"""
+X-UI Monitor - Date & Duration Formatting
+Jalali date and time-remaining formatting shared by the scanner and exports.
+
+Many clients share the same expiry day, so Jalali conversion is memoized per
+local calendar day (bounded LRU). The *_series helpers format whole columns at
+once for bulk paths, converting each distinct day only once.
+"""
+
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import jdatetime
+import numpy as np
+
+DAY_SECONDS = 24 * 60 * 60
+JALALI_CACHE_SIZE = 4096
+EPOCH_DATE = date(1970, 1, 1)
+
+
+@lru_cache(maxsize=JALALI_CACHE_SIZE)
+def _jalali_for_day(day):
+    return jdatetime.date.fromgregorian(date=day).strftime("%Y/%m/%d")
+
+def to_jalali(timestamp_ms):
+    try:
+        if timestamp_ms <= 0: return "-"
+        return _jalali_for_day(datetime.fromtimestamp(timestamp_ms / 1000).date())
+    except:
+        return "-"
+
+def format_time_remaining(days_decimal):
+    if days_decimal == '∞' or not isinstance(days_decimal, (int, float)):
+        return '∞'
+    if days_decimal < 0:
+        return f"Expired ({int(abs(days_decimal))}d)"
+    total_seconds = int(days_decimal * DAY_SECONDS)
+    days = total_seconds // DAY_SECONDS
+    hours = (total_seconds % DAY_SECONDS) // 3600
+    if days > 0: return f"{days}d {hours}h"
+    return f"{hours}h"
+
+def _utc_offset(seconds):
+    return time.localtime(seconds).tm_gmtoff
+
+def jalali_series(timestamps_ms):
+    """Vectorized to_jalali over an array of ms timestamps; converts each distinct local day once"""
+    ts = np.asarray(timestamps_ms, dtype=np.float64)
+    out = np.full(ts.shape, "-", dtype=object)
+    valid = np.isfinite(ts) & (ts > 0)
+    if not valid.any(): return out
+
+    seconds = (ts[valid] // 1000).astype(np.int64)
+    # Local offset per UTC day (checked at both ends of the day); days with a
+    # DST switch fall back to per-timestamp offsets
+    utc_days, day_idx = np.unique(seconds // DAY_SECONDS, return_inverse=True)
+    day_offsets = np.empty(len(utc_days), dtype=np.int64)
+    switch_days = []
+    for i, d in enumerate(utc_days):
+        start = int(d) * DAY_SECONDS
+        day_offsets[i] = _utc_offset(start)
+        if _utc_offset(start + DAY_SECONDS - 1) != day_offsets[i]: switch_days.append(i)
+    local = seconds + day_offsets[day_idx]
+    for i in switch_days:
+        mask = day_idx == i
+        local[mask] = [s + _utc_offset(int(s)) for s in seconds[mask]]
+
+    local_days, local_idx = np.unique(local // DAY_SECONDS, return_inverse=True)
+    labels = np.array([_jalali_for_day(EPOCH_DATE + timedelta(days=int(d))) for d in local_days], dtype=object)
+    out[valid] = labels[local_idx]
+    return out
+
+def time_remaining_series(days_decimal):
+    """Vectorized format_time_remaining over an array of (fractional) days; NaN/inf -> ∞"""
+    values = np.asarray(days_decimal, dtype=np.float64)
+    out = np.full(values.shape, "∞", dtype=object)
+    finite = np.isfinite(values)
+    expired = finite & (values < 0)
+    out[expired] = [f"Expired ({d}d)" for d in np.abs(values[expired]).astype(np.int64)]
+    active = finite & (values >= 0)
+    total_seconds = (values[active] * DAY_SECONDS).astype(np.int64)
+    days = total_seconds // DAY_SECONDS
+    hours = (total_seconds % DAY_SECONDS) // 3600
+    out[active] = [f"{d}d {h}h" if d > 0 else f"{h}h" for d, h in zip(days.tolist(), hours.tolist())]
+    return out
@@ -1,21 +1,22 @@
 import streamlit as st
-import requests
 import pandas as pd
-import time
-import json
 import os
-import yaml
-import jdatetime
-import re
-import urllib3
+import time
 from urllib.parse import quote
-from datetime import datetime
-from yaml.loader import SafeLoader
 import streamlit_authenticator as stauth
-from utils import load_servers, save_server, delete_server
-
-# غیرفعال کردن اخطارهای امنیتی SSL
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from admin_manager import config_stamp, read_config, user_servers
+from utils import load_servers, save_server, delete_server, load_settings, save_all_settings
+from transport import get_transport
+from scanner import extract_core_phone, classify_metrics, count_flags, metrics_from_json
+import client_index
+import alert_state
+from collector import has_snapshots, load_snapshots, merge_snapshot_blocks
+from result_store import ResultStore
+from recorder import list_recordings, replay
+from profiler import profile_exists, profile_meta, profile_file, top_functions
+from scan_jobs import JobManager, finalize_scan, JOB_CANCELLED, JOB_FAILED
+from panel_actions import ACTIONS, run_bulk_action
+from export import export_formats, export_rows
 
 # --- Page Config ---
 st.set_page_config(page_title="X-UI Monitor", layout="wide", page_icon="🛡️")
@@ -147,72 +148,13 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Constants ---
-GB = 1024 * 1024 * 1024
-MB = 1024 * 1024
-DAY_SECONDS = 24 * 60 * 60
-SETTINGS_FILE = "settings.json"
+PAGE_SIZE = 100
 
 # --- SVG ICONS ---
 SVG_WA = """<svg viewBox="0 0 24 24"><path d="M17.472 14.382c-.297-.149-1.758-.867-2.03-.967-.273-.099-.471-.148-.67.15-.197.297-.767.966-.94 1.164-.173.199-.347.223-.644.075-.297-.15-1.255-.463-2.39-1.475-.883-.788-1.48-1.761-1.653-2.059-.173-.297-.018-.458.13-.606.134-.133.298-.347.446-.52.149-.174.198-.298.298-.497.099-.198.05-.371-.025-.52-.075-.149-.669-1.612-.916-2.207-.242-.579-.487-.5-.669-.51-.173-.008-.371-.01-.57-.01-.198 0-.52.074-.792.372-.272.297-1.04 1.016-1.04 2.479 0 1.462 1.065 2.875 1.213 3.074.149.198 2.096 3.2 5.077 4.487.709.306 1.262.489 1.694.625.712.227 1.36.195 1.871.118.571-.085 1.758-.719 2.006-1.413.248-.694.248-1.289.173-1.413-.074-.124-.272-.198-.57-.347m-5.421 7.403h-.004a9.87 9.87 0 01-5.031-1.378l-.361-.214-3.741.982.998-3.648-.235-.374a9.86 9.86 0 01-1.51-5.26c.001-5.45 4.436-9.884 9.888-9.884 2.64 0 5.122 1.03 6.988 2.898a9.825 9.825 0 012.893 6.994c-.003 5.45-4.437 9.884-9.885 9.884m8.413-18.297A11.815 11.815 0 0012.05 0C5.495 0 .16 5.335.157 11.892c0 2.096.547 4.142 1.588 5.945L.057 24l6.305-1.654a11.882 11.882 0 005.683 1.448h.005c6.554 0 11.89-5.335 11.893-11.893a11.821 11.821 0 00-3.48-8.413Z"/></svg>"""
 SVG_SMS = """<svg viewBox="0 0 24 24"><path d="M20 2H4c-1.1 0-2 .9-2 2v18l4-4h14c1.1 0 2-.9 2-2V4c0-1.1-.9-2-2-2zm0 14H6l-2 2V4h16v12z"/></svg>"""
 
 # --- Helper Functions ---
-def get_default_settings():
-    return {
-        "filters": {"days": 3, "gb": 2.0, "hide": 7, "debug": False},
-        "templates": {
-            "ended": "مشترک گرامی {user}، حجم سرویس شما به پایان رسیده است.\nلطفا جهت تمدید اقدام فرمایید.",
-            "expired": "مشترک گرامی {user}، زمان سرویس شما به پایان رسیده است.\nلطفا جهت تمدید اقدام فرمایید.",
-            "low": "مشترک گرامی {user}، تنها {rem} از حجم سرویس شما باقی مانده است.\nتمدید میفرمایید؟",
-            "soon": "مشترک گرامی {user}، تنها {time} از زمان سرویس شما باقی مانده است.\nتمدید میفرمایید؟"
-        }
-    }
-
-def load_settings():
-    defaults = get_default_settings()
-    if os.path.exists(SETTINGS_FILE):
-        try:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                saved = json.load(f)
-                if "filters" not in saved: saved["filters"] = defaults["filters"]
-                if "templates" not in saved: saved["templates"] = defaults["templates"]
-                return saved
-        except:
-            return defaults
-    return defaults
-
-def save_all_settings(settings_dict):
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(settings_dict, f, ensure_ascii=False, indent=4)
-
-def to_jalali(timestamp_ms):
-    try:
-        if timestamp_ms <= 0: return "-"
-        dt = datetime.fromtimestamp(timestamp_ms / 1000)
-        jalali_date = jdatetime.date.fromgregorian(date=dt.date())
-        return jalali_date.strftime("%Y/%m/%d")
-    except:
-        return "-"
-
-def format_time_remaining(days_decimal):
-    if days_decimal == '∞' or not isinstance(days_decimal, (int, float)): 
-        return '∞'
-    if days_decimal < 0:
-        return f"Expired ({int(abs(days_decimal))}d)"
-    total_seconds = int(days_decimal * DAY_SECONDS)
-    days = total_seconds // DAY_SECONDS
-    hours = (total_seconds % DAY_SECONDS) // 3600
-    if days > 0: return f"{days}d {hours}h"
-    return f"{hours}h"
-
-def extract_core_phone(username):
-    digits_only = re.sub(r'\D', '', username)
-    match_98 = re.search(r'98(9\d{9})', digits_only)
-    if match_98: return match_98.group(1)
-    match_09 = re.search(r'0(9\d{9})', digits_only)
-    if match_09: return match_09.group(1)
-    return None
-
 def get_sms_link(core_number, text):
     if not core_number: return "#"
     phone = "+98" + core_number
@@ -223,9 +165,28 @@ def get_wa_link(core_number, text):
     phone = "98" + core_number
     return f"whatsapp://send?phone={phone}&text={quote(text)}"
 
+@st.cache_resource
+def get_result_store():
+    # نتایج هر سرور یک بلوک جدا؛ نمای هر ادمین از کنار هم گذاشتن بلوک‌های مجاز ساخته می‌شود
+    return ResultStore()
+
+@st.cache_resource
+def get_shared_transport():
+    # یک ترنسپورت برای کل پروسه تا اتصال‌ها و سشن‌ها دوباره استفاده شوند
+    return get_transport()
+
+@st.cache_resource
+def get_job_manager():
+    # اسکن‌ها در ترد پس‌زمینه اجرا می‌شوند و بین همه‌ی سشن‌ها مشترک‌اند
+    return JobManager(get_result_store(), get_shared_transport())
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_auth_config(stamp):
+    # stamp = (mtime, size): فایل فقط وقتی دوباره خوانده می‌شود که admin_manager آن را تغییر دهد
+    return read_config()
+
 # --- Authentication ---
-with open('auth_config.yaml') as file:
-    config = yaml.load(file, Loader=SafeLoader)
+config = load_auth_config(config_stamp())
 
 authenticator = stauth.Authenticate(
     config['credentials'],
@@ -242,6 +203,41 @@ elif st.session_state["authentication_status"] is None:
     st.warning('Please enter your username and password')
 elif st.session_state["authentication_status"]:
     
+    allowed_servers = user_servers(config, st.session_state.get('username'))
+
+    def visible_servers():
+        servers = load_servers()
+        if allowed_servers is None: return servers
+        return [s for s in servers if s['name'] in allowed_servers]
+
+    def publish_results(scanned_names, ok_names):
+        """Tag the stored rows with alert state and build this admin's view"""
+        resolved = finalize_scan(get_result_store(), scanned_names, ok_names)
+        show_results(resolved, current_thresholds())
+
+    def show_results(resolved, thresholds):
+        visible_names = [s['name'] for s in visible_servers()]
+        st.session_state['scan_results'] = get_result_store().view(visible_names)
+        st.session_state['resolved_alerts'] = [r for r in resolved if r['Server'] in visible_names]
+        st.session_state['view_thresholds'] = thresholds
+
+    def current_thresholds():
+        return (warning_days, warning_gb, hide_days, debug_mode)
+
+    def reclassify_view():
+        """Re-evaluate the stored raw metrics with the sidebar thresholds, no refetch"""
+        old_states = {(r['Server'], r['User']): r.get('State', "") for r in st.session_state.get('scan_results', [])}
+        rows = []
+        for name, block in get_result_store().blocks([s['name'] for s in visible_servers()]):
+            if block['metrics'] is None:
+                rows.extend(block['rows'])
+                continue
+            for row in classify_metrics(name, block['metrics'], warning_days, warning_gb, hide_days, debug=debug_mode):
+                row['State'] = old_states.get((name, row['User']), "")
+                rows.append(row)
+        st.session_state['scan_results'] = rows
+        st.session_state['view_thresholds'] = current_thresholds()
+
     if 'app_settings' not in st.session_state:
         st.session_state['app_settings'] = load_settings()
     settings = st.session_state['app_settings']
@@ -267,6 +263,13 @@ elif st.session_state["authentication_status"]:
         warning_gb = st.number_input("Warning GB (<)", value=val_gb, min_value=0.5, step=0.5)
         hide_days = st.number_input("Hide Expired (> Days)", value=val_hide, min_value=1)
         debug_mode = st.checkbox("🐞 Debug Mode", value=val_debug)
+        record_mode = st.checkbox("🎙️ Record Scans", value=settings['filters'].get('record', False), help="Save raw panel payloads for offline replay")
+        profile_mode = st.checkbox("🔥 Profile Scans", value=settings['filters'].get('profile', False) or os.environ.get("XUI_PROFILE") == "1", help="Capture cProfile stats and a flamegraph of each scan")
+
+        metrics_list = [b['metrics'] for _, b in get_result_store().blocks([s['name'] for s in visible_servers()]) if b['metrics'] is not None]
+        if metrics_list:
+            flags = count_flags(metrics_list, warning_days, warning_gb, hide_days)
+            st.caption("Would flag: " + " • ".join(f"{k} {v}" for k, v in flags.items()) + f" (total {sum(flags.values())})")
         
         st.divider()
         with st.expander("💬 Message Templates", expanded=True):
@@ -278,11 +281,16 @@ elif st.session_state["authentication_status"]:
             new_soon = st.text_area("⏱️ Expiring Soon:", value=current_tpl["soon"], height=70)
         
         st.write("")
-        if st.button("💾 Save All Settings", type="primary", use_container_width=True):
+        # settings.json is global (every admin, collector nodes): only full admins may rewrite it
+        if allowed_servers is not None:
+            st.caption("Thresholds apply to this session only; saving settings is limited to full admins.")
+        elif st.button("💾 Save All Settings", type="primary", use_container_width=True):
             settings['filters']['days'] = warning_days
             settings['filters']['gb'] = warning_gb
             settings['filters']['hide'] = hide_days
             settings['filters']['debug'] = debug_mode
+            settings['filters']['record'] = record_mode
+            settings['filters']['profile'] = profile_mode
             settings['templates']['ended'] = new_ended
             settings['templates']['expired'] = new_expired
             settings['templates']['low'] = new_low
@@ -300,130 +308,138 @@ elif st.session_state["authentication_status"]:
     # =======================================================
     with tab_monitor:
         
-        def login_and_get_stats(server):
-            session = requests.Session()
-            base_url = server['url'].rstrip('/')
-            login_url = f"{base_url}/login"
-            payload = {"username": server['username'], "password": server['password']}
-            
-            try:
-                session.post(login_url, data=payload, timeout=8, verify=False)
-            except: return None
-
-            api_endpoints = [
-                f"{base_url}/panel/api/inbounds/list",
-                f"{base_url}/xui/API/inbounds/",
-                f"{base_url}/xui/API/inbounds",
-                f"{base_url}/xui/API/inbounds/list",
-                f"{base_url}/api/inbounds/list"
-            ]
-            
-            for url in api_endpoints:
-                try:
-                    res = session.get(url, timeout=8, verify=False)
-                    if res.status_code == 200:
-                        try:
-                            data = res.json()
-                            if data.get('success'): return data.get('obj')
-                        except: pass
-                except: pass
-            return None
-
-        def process_clients(server_name, inbounds, debug=False):
-            alerts = []
-            current_time = int(time.time() * 1000) 
-            for inbound in inbounds:
-                stats_map = {}
-                if 'clientStats' in inbound:
-                    for stat in inbound['clientStats']:
-                        stats_map[stat['email']] = {'up': stat.get('up',0), 'down': stat.get('down',0)}
-                try:
-                    settings = inbound['settings']
-                    if isinstance(settings, str): settings = json.loads(settings)
-                    clients = settings.get('clients', [])
-                except: clients = []
-                
-                for client in clients:
-                    email = client.get('email', 'Unknown')
-                    enable = client.get('enable', True)
-                    is_enabled = True
-                    if enable is False or str(enable).lower() == "false" or enable == 0: is_enabled = False
-                    
-                    if not is_enabled and not debug: continue
-                    
-                    real_stats = stats_map.get(email)
-                    if real_stats:
-                        up, down = real_stats['up'], real_stats['down']
-                    else:
-                        up, down = client.get('up', 0), client.get('down', 0)
-                    
-                    total_allowed = client.get('totalGB', 0)
-                    expiry_time = client.get('expiryTime', 0)
-                    formatted_rem, days_left_formatted = "∞", "∞"
-                    status, jalali_expiry = "OK", "-"
-                    total_usage = up + down
-                    
-                    if total_allowed > 0:
-                        remaining = total_allowed - total_usage
-                        remaining_gb_val = remaining / GB
-                        if remaining <= 0: status = "⛔ ENDED"
-                        elif remaining_gb_val < warning_gb:
-                            if total_usage > 0: status = f"🪫 LOW DATA"
-                        if remaining_gb_val < 1: formatted_rem = f"{int(remaining/MB)}MB"
-                        else: formatted_rem = f"{remaining_gb_val:.1f}GB"
-                    
-                    is_zombie = False
-                    if expiry_time > 0:
-                        jalali_expiry = to_jalali(expiry_time)
-                        diff_ms = expiry_time - current_time
-                        days_decimal = diff_ms / (1000 * DAY_SECONDS)
-                        days_left_formatted = format_time_remaining(days_decimal)
-                        if diff_ms <= 0:
-                            if (abs(diff_ms)/(1000*DAY_SECONDS)) > hide_days: is_zombie = True
-                            if "ENDED" not in status: status = "☠️ EXPIRED" 
-                        elif diff_ms < (warning_days * DAY_SECONDS * 1000):
-                            if "ENDED" not in status: status = f"⏱️ SOON"
-
-                    show_row = False
-                    if debug: show_row = True
-                    else:
-                        if is_zombie: show_row = False
-                        elif "⛔" in status or "☠️" in status or "🪫" in status or "⏱️" in status: show_row = True
-                    
-                    if show_row:
-                        alerts.append({
-                            "Server": server_name, "User": email, "Status": status,
-                            "Rem": formatted_rem, "Time": days_left_formatted,
-                            "ExpDate": jalali_expiry
-                        })
-            return alerts
+        # --- CLIENT LOOKUP ---
+        lookup_query = st.text_input("🔎 Find client", placeholder="Email prefix or phone (0912..., +98912...)", label_visibility="collapsed")
+        if lookup_query:
+            matches = client_index.lookup(lookup_query, servers=allowed_servers)
+            if matches:
+                st.dataframe(pd.DataFrame(matches), width="stretch", hide_index=True)
+            else:
+                st.info("No matching client in the index. Run a scan to refresh it.")
 
         st.write("") # Spacer for better alignment
         if st.button("🔄 Check Servers Now", type="primary", use_container_width=True):
-            st.session_state['checking'] = True
-            if 'scan_results' in st.session_state: del st.session_state['scan_results']
-
-        if st.session_state.get('checking', False):
-            servers = load_servers()
+            servers = visible_servers()
             if not servers:
                 st.warning("No servers added yet.")
-                st.session_state['checking'] = False
             else:
-                all_data = []
-                progress_bar = st.progress(0, text="Scanning...")
-                total = len(servers)
-                for i, s in enumerate(servers):
-                    progress_bar.progress((i + 1) / total, text=f"Scanning {s['name']}...")
-                    inbounds = login_and_get_stats(s)
-                    if inbounds:
-                        alerts = process_clients(s['name'], inbounds, debug=debug_mode)
-                        all_data.extend(alerts)
-                    else:
-                        all_data.append({"Server": s['name'], "User": "-", "Status": "❌ Failed", "Rem": "-", "Time": "-", "ExpDate": "-"})
-                progress_bar.empty()
-                st.session_state['scan_results'] = all_data
-                st.session_state['checking'] = False
-                st.rerun()
+                job = get_job_manager().submit(servers, current_thresholds(), record=record_mode,
+                                               profile=profile_mode, requested_by=st.session_state.get('username'))
+                st.session_state['scan_job'] = job.id
+                if 'scan_results' in st.session_state: del st.session_state['scan_results']
+                st.session_state.pop('bulk_report', None)
+                st.session_state.pop('export_file', None)
+                st.session_state.pop('collector_nodes', None)
+                st.session_state.pop('replay_of', None)
+                st.session_state.pop('scan_profile', None)
+
+        # --- SCAN JOB (runs in the background; partial results per finished server) ---
+        scan_job = get_job_manager().get(st.session_state['scan_job']) if st.session_state.get('scan_job') else None
+        job_running = bool(scan_job and scan_job.active)
+        if job_running:
+            visible_names = {s['name'] for s in visible_servers()}
+            done = [n for n in scan_job.done if n in visible_names]
+            total = len([n for n in scan_job.names if n in visible_names])
+            label = f"Scan {scan_job.id}: {len(done)}/{total} servers"
+            if scan_job.requested_by != st.session_state.get('username'):
+                label += f" (shared with {scan_job.requested_by})"
+            if scan_job.cancel_event.is_set():
+                label += " • cancelling..."
+            jc1, jc2 = st.columns([4, 1])
+            with jc1:
+                st.progress(len(done) / total if total else 0.0, text=label)
+            with jc2:
+                if st.button("⏹️ Cancel Scan", use_container_width=True, disabled=scan_job.cancel_event.is_set()):
+                    scan_job.cancel()
+            st.session_state['scan_results'] = [dict(r, State=r.get('State', "")) for r in get_result_store().view(done)]
+            st.session_state['resolved_alerts'] = []
+            st.session_state['view_thresholds'] = scan_job.thresholds
+        elif scan_job:
+            show_results(scan_job.resolved, scan_job.thresholds)
+            if scan_job.profile: st.session_state['scan_profile'] = scan_job.scan_id
+            if scan_job.status == JOB_CANCELLED:
+                st.warning(f"Scan {scan_job.id} cancelled after {len(scan_job.done)}/{len(scan_job.names)} servers.")
+            elif scan_job.status == JOB_FAILED:
+                st.error(f"Scan {scan_job.id} failed: {scan_job.error}")
+            st.session_state.pop('scan_job')
+        elif st.session_state.get('scan_job'):
+            st.session_state.pop('scan_job')
+
+        if has_snapshots() and st.button("🌐 Load Collector Snapshots", use_container_width=True):
+            blocks, nodes_meta = merge_snapshot_blocks(load_snapshots())
+            if not nodes_meta:
+                st.warning("No snapshots received from collector nodes yet.")
+            else:
+                names = [n for n in blocks if allowed_servers is None or n in allowed_servers]
+                index_filters = load_settings()['filters']
+                for name in names:
+                    block = blocks[name]
+                    # Snapshots from older collectors have rows only
+                    metrics = metrics_from_json(block['metrics']) if block.get('metrics') else None
+                    get_result_store().put(name, block.get('rows', []), ok=block.get('ok', False),
+                                           scanned_at=block.get('scanned_at'), metrics=metrics)
+                    if block.get('ok') and metrics is not None:
+                        client_index.update_server(name, metrics, index_filters['days'], index_filters['gb'])
+                publish_results(names, [n for n in names if blocks[n].get('ok')])
+                st.session_state['collector_nodes'] = nodes_meta
+                st.session_state.pop('replay_of', None)
+                st.session_state.pop('bulk_report', None)
+                st.session_state.pop('export_file', None)
+
+        recordings = list_recordings()
+        if recordings:
+            with st.expander("⏪ Replay Recorded Scan"):
+                st.caption("Re-classifies saved panel payloads with the sidebar thresholds, without touching the panels.")
+                rp1, rp2 = st.columns([2, 1])
+                with rp1:
+                    replay_id = st.selectbox("Recording:", options=recordings, label_visibility="collapsed")
+                with rp2:
+                    if st.button("⏪ Replay", use_container_width=True):
+                        rows = replay(replay_id, warning_days, warning_gb, hide_days, debug=debug_mode, servers=allowed_servers)
+                        for row in rows:
+                            row['State'] = ""
+                        st.session_state['scan_results'] = rows
+                        st.session_state['resolved_alerts'] = []
+                        st.session_state['replay_of'] = replay_id
+                        st.session_state.pop('bulk_report', None)
+                        st.session_state.pop('export_file', None)
+
+        if st.session_state.get('replay_of') and 'scan_results' in st.session_state:
+            st.info(f"⏪ Showing offline replay of {st.session_state['replay_of']}")
+
+        if st.session_state.get('collector_nodes'):
+            with st.expander("🌐 Collector Nodes"):
+                st.dataframe(pd.DataFrame(st.session_state['collector_nodes']), width="stretch", hide_index=True)
+
+        if st.session_state.get('scan_profile') and not profile_exists(st.session_state['scan_profile']):
+            st.session_state.pop('scan_profile')  # pruned by newer profiled scans
+        if st.session_state.get('scan_profile'):
+            profile_id = st.session_state['scan_profile']
+            meta = profile_meta(profile_id)
+            with st.expander(f"🔥 Scan Profile ({meta['elapsed']}s, {meta['samples']} samples)"):
+                st.dataframe(pd.DataFrame(top_functions(profile_id)), width="stretch", hide_index=True)
+                pf1, pf2 = st.columns(2)
+                with pf1:
+                    st.download_button("⬇️ cProfile (.prof)", data=profile_file(profile_id, "prof"),
+                                       file_name=f"scan-{profile_id}.prof", use_container_width=True)
+                with pf2:
+                    st.download_button("⬇️ Flamegraph stacks", data=profile_file(profile_id, "collapsed"),
+                                       file_name=f"scan-{profile_id}.collapsed.txt", use_container_width=True)
+                st.caption("Open .prof in snakeviz/speedscope; feed the stacks to flamegraph.pl or speedscope.")
+
+        # Another admin may already have scanned our servers: reuse the shared blocks
+        if 'scan_results' not in st.session_state and not job_running:
+            visible_names = [s['name'] for s in visible_servers()]
+            last_scan = get_result_store().last_scan(visible_names)
+            if last_scan:
+                st.session_state['scan_results'] = get_result_store().view(visible_names)
+                st.caption(f"Showing results from the last scan at {time.strftime('%H:%M', time.localtime(last_scan))}.")
+
+        if ('scan_results' in st.session_state and not st.session_state.get('replay_of') and not job_running
+                and st.session_state.get('view_thresholds') != current_thresholds()):
+            t0 = time.perf_counter()
+            reclassify_view()
+            st.caption(f"Re-classified with new thresholds in {(time.perf_counter() - t0) * 1000:.0f} ms (no rescan).")
 
         if 'scan_results' in st.session_state:
             results = st.session_state['scan_results']
@@ -435,11 +451,85 @@ elif st.session_state["authentication_status"]:
                 
                 if sel:
                     df_filtered = df[df['Server'].isin(sel)].copy()
-                    st.caption(f"Found {len(df_filtered)} issues.")
+                    n_new = int((df_filtered['State'] == alert_state.STATE_NEW).sum())
+                    n_notified = int((df_filtered['State'] == alert_state.STATE_NOTIFIED).sum())
+                    resolved = [r for r in st.session_state.get('resolved_alerts', []) if r['Server'] in sel]
+                    st.caption(f"Found {len(df_filtered)} issues • {n_new} new since last scan • {n_notified} notified • {len(resolved)} resolved.")
+                    if st.checkbox("🆕 Only new since last scan"):
+                        df_filtered = df_filtered[df_filtered['State'] == alert_state.STATE_NEW]
+                    if resolved:
+                        with st.expander(f"✅ Resolved since last scan ({len(resolved)})"):
+                            st.dataframe(pd.DataFrame(resolved), width="stretch", hide_index=True)
+
+                    # --- EXPORT ---
+                    ex1, ex2 = st.columns([1, 2])
+                    with ex1:
+                        export_fmt = st.selectbox("Export format", options=export_formats(), label_visibility="collapsed")
+                    with ex2:
+                        if st.button("📦 Prepare Export", use_container_width=True):
+                            sel_set = set(sel)
+                            # Rows are written incrementally; the finished payload is read once and kept for reruns
+                            with export_rows((r for r in results if r['Server'] in sel_set), export_fmt) as export_file:
+                                st.session_state['export_file'] = (export_fmt, export_file.read())
+                    if 'export_file' in st.session_state:
+                        fmt, export_data = st.session_state['export_file']
+                        st.download_button(f"⬇️ Download {fmt.upper()}", data=export_data, file_name=f"xui_scan_{time.strftime('%Y%m%d_%H%M')}.{fmt}",
+                                           mime="text/csv" if fmt == "csv" else "application/octet-stream", use_container_width=True)
+
+                    # --- BULK ACTIONS ---
+                    with st.expander("⚡ Bulk Actions"):
+                        statuses = [x for x in df_filtered['Status'].unique().tolist() if x != "❌ Failed"]
+                        ba1, ba2, ba3 = st.columns([2, 1, 1])
+                        with ba1:
+                            # Debug Mode lists healthy users too; they must be picked explicitly
+                            bulk_status = st.multiselect("Statuses:", options=statuses, default=[x for x in statuses if x != "OK"])
+                        with ba2:
+                            bulk_action = st.selectbox("Action:", options=list(ACTIONS), format_func=ACTIONS.get)
+                        with ba3:
+                            bulk_days = st.number_input("Days:", value=30, min_value=1, disabled=bulk_action != "extend")
+
+                        targets = df_filtered[df_filtered['Status'].isin(bulk_status)]
+                        st.caption(f"{len(targets)} users on {targets['Server'].nunique()} servers selected.")
+                        bulk_confirm = st.checkbox("I understand this changes users on the panels")
+                        is_replay = bool(st.session_state.get('replay_of'))
+                        if is_replay:
+                            st.caption("A replay shows recorded data; run a scan before applying changes.")
+
+                        bb1, bb2 = st.columns(2)
+                        bulk_run = None
+                        with bb1:
+                            if st.button("👁️ Preview (Dry Run)", use_container_width=True): bulk_run = True
+                        with bb2:
+                            if st.button("🚀 Apply", type="primary", use_container_width=True, disabled=not bulk_confirm or is_replay): bulk_run = False
+
+                        if bulk_run is not None and len(targets):
+                            with st.spinner("Dry run..." if bulk_run else "Applying..."):
+                                report = run_bulk_action(visible_servers(), targets.to_dict('records'), bulk_action,
+                                                         days=bulk_days, dry_run=bulk_run, transport=get_shared_transport())
+                            st.session_state['bulk_report'] = report
+
+                        if st.session_state.get('bulk_report'):
+                            df_report = pd.DataFrame(st.session_state['bulk_report'])
+                            st.caption(" • ".join(f"{k}: {v}" for k, v in df_report['Result'].value_counts().items()))
+                            st.dataframe(df_report, width="stretch", hide_index=True)
                     
                     tpl = settings['templates']
 
-                    for index, row in df_filtered.iterrows():
+                    # فقط یک صفحه از کارت‌ها رندر می‌شود؛ لیست کامل از طریق Export
+                    total_pages = max(1, -(-len(df_filtered) // PAGE_SIZE))
+                    page = 1
+                    if total_pages > 1:
+                        page = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, value=1)
+                    df_page = df_filtered.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+
+                    if st.button("📨 Mark shown users as notified"):
+                        shown = {(r['Server'], r['User']) for r in df_page.to_dict('records') if r['User'] != "-"}
+                        alert_state.mark_notified(shown)
+                        for row in results:
+                            if (row['Server'], row['User']) in shown: row['State'] = alert_state.STATE_NOTIFIED
+                        st.rerun()
+
+                    for index, row in df_page.iterrows():
                         color = "#777"
                         msg_template = ""
                         
@@ -456,6 +546,10 @@ elif st.session_state["authentication_status"]:
                             color = "#ffff00"
                             msg_template = tpl["soon"]
 
+                        state_badge = ""
+                        if row['State'] in (alert_state.STATE_NEW, alert_state.STATE_NOTIFIED):
+                            state_badge = f'<span class="server-name">{row["State"]}</span>'
+
                         core_number = extract_core_phone(row['User'])
                         btns_html = ""
                         
@@ -478,6 +572,7 @@ elif st.session_state["authentication_status"]:
                                 <div>
                                     <span class="user-name">{row['User']}</span>
                                     <span class="server-name">({row['Server']})</span>
+                                    {state_badge}
                                 </div>
                                 <div style="margin-top:2px;">
                                     <span class="status-text" style="color: {color};">{row['Status']}</span>
@@ -502,23 +597,27 @@ elif st.session_state["authentication_status"]:
     with tab_servers:
         st.title("⚙️ Servers")
         
-        current_servers = load_servers()
+        current_servers = visible_servers()
+        can_manage = allowed_servers is None
         if current_servers:
             df_servers = pd.DataFrame(current_servers)
             st.dataframe(df_servers[['name', 'url', 'username']], width="stretch")
             
-            st.divider()
-            c1, c2 = st.columns([2, 1])
-            with c1:
-                server_to_delete = st.selectbox("Select Server", options=[s['name'] for s in current_servers])
-            with c2:
-                st.write("") 
-                st.write("") 
-                if st.button("🗑️ Delete", type="primary"):
-                    delete_server(server_to_delete)
-                    st.success("Removed!")
-                    time.sleep(1)
-                    st.rerun()
+            if can_manage:
+                st.divider()
+                c1, c2 = st.columns([2, 1])
+                with c1:
+                    server_to_delete = st.selectbox("Select Server", options=[s['name'] for s in current_servers])
+                with c2:
+                    st.write("") 
+                    st.write("") 
+                    if st.button("🗑️ Delete", type="primary"):
+                        delete_server(server_to_delete)
+                        client_index.remove_server(server_to_delete)
+                        get_result_store().drop(server_to_delete)
+                        st.success("Removed!")
+                        time.sleep(1)
+                        st.rerun()
             
             # --- TEST CONNECTION ---
             st.divider()
@@ -533,48 +632,42 @@ elif st.session_state["authentication_status"]:
                     srv = next((s for s in current_servers if s['name'] == test_srv_name), None)
                     if srv:
                         with st.spinner("Pinging..."):
-                            session = requests.Session()
-                            base_url = srv['url'].rstrip('/')
-                            login_url = f"{base_url}/login"
-                            payload = {"username": srv['username'], "password": srv['password']}
                             try:
-                                res = session.post(login_url, data=payload, timeout=10, verify=False)
-                                st.code(f"Login Status: {res.status_code}")
-                                
-                                endpoints = [
-                                    f"{base_url}/panel/api/inbounds/list",
-                                    f"{base_url}/xui/API/inbounds/",
-                                    f"{base_url}/xui/API/inbounds",
-                                    f"{base_url}/xui/API/inbounds/list",
-                                    f"{base_url}/api/inbounds/list"
-                                ]
-                                for ep in endpoints:
-                                    try:
-                                        r = session.get(ep, timeout=10, verify=False)
-                                        if r.status_code == 200:
-                                            st.success(f"OK: {ep}")
-                                        else:
-                                            st.warning(f"Fail: {ep} ({r.status_code})")
-                                    except Exception as e:
-                                        st.error(f"Err: {ep} -> {e}")
+                                login_status, probes = get_shared_transport().probe(srv, timeout=10)
+                                st.code(f"Login Status: {login_status}")
+                                for ep, status_code, err in probes:
+                                    if err is not None:
+                                        st.error(f"Err: {ep} -> {err}")
+                                    elif status_code == 200:
+                                        st.success(f"OK: {ep}")
+                                    else:
+                                        st.warning(f"Fail: {ep} ({status_code})")
                             except Exception as e:
                                 st.error(f"Login Failed: {e}")
         else:
             st.info("No servers.")
 
-        st.divider()
-        st.subheader("Add Server")
-        with st.form("add_server_form"):
-            col_a, col_b = st.columns(2)
-            with col_a:
-                new_name = st.text_input("Name")
-                new_url = st.text_input("URL")
-            with col_b:
-                new_user = st.text_input("User", value="admin")
-                new_pass = st.text_input("Pass", type="password")
+        if can_manage:
+            st.divider()
+            st.subheader("Add Server")
+            with st.form("add_server_form"):
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    new_name = st.text_input("Name")
+                    new_url = st.text_input("URL")
+                with col_b:
+                    new_user = st.text_input("User", value="admin")
+                    new_pass = st.text_input("Pass", type="password")
             
-            if st.form_submit_button("Save"):
-                save_server(new_name, new_url, new_user, new_pass)
-                st.success("Saved!")
-                time.sleep(1)
-                st.rerun()
+                if st.form_submit_button("Save"):
+                    save_server(new_name, new_url, new_user, new_pass)
+                    st.success("Saved!")
+                    time.sleep(1)
+                    st.rerun()
+        else:
+            st.caption("Adding or removing servers is limited to full admins.")
+
+    # Poll the background scan so partial results keep arriving
+    if job_running:
+        time.sleep(1)
+        st.rerun()
@@ -0,0 +1,178 @@
+"""
+X-UI Monitor - Bulk Client Actions
+Write-back operations on panel clients (extend expiry, reset traffic, disable),
+batched per panel and run concurrently across panels.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from scanner import DAY_SECONDS, inbound_clients
+from transport import API_ENDPOINTS, API_PREFIXES, RequestsTransport
+
+ACTIONS = {
+    "extend": "📅 Extend Expiry",
+    "reset": "🔄 Reset Traffic",
+    "disable": "🚫 Disable",
+}
+
+MAX_PANEL_WORKERS = 8
+
+
+def _client_key(protocol, client):
+    """The identifier X-UI expects in updateClient/{id} for each protocol"""
+    if protocol == "trojan": return client.get('password')
+    if protocol == "shadowsocks": return client.get('email')
+    return client.get('id')
+
+
+def _load_inbounds(transport, server):
+    """
+    Return (session, list_path, inbounds), reusing the authenticated scan session
+    when it still works and logging in again otherwise.
+    """
+    base_url = server['url'].rstrip('/')
+    session = transport.sessions.get(server['name'])
+    path = transport.api_paths.get(server['name'])
+    if session is not None and path:
+        try:
+            res = session.get(f"{base_url}{path}", timeout=transport.timeout)
+            data = res.json()
+            if data.get('success'): return session, path, data.get('obj') or []
+        except: pass
+
+    session = transport.login(server)
+    for path in API_ENDPOINTS:
+        try:
+            res = session.get(f"{base_url}{path}", timeout=transport.timeout)
+            data = res.json()
+            if res.status_code == 200 and data.get('success'):
+                transport.api_paths[server['name']] = path
+                return session, path, data.get('obj') or []
+        except: pass
+    raise RuntimeError("no working inbound API endpoint")
+
+
+def _post(session, url, timeout, data=None):
+    res = session.post(url, data=data, timeout=timeout)
+    try:
+        body = res.json()
+    except:
+        return False, f"HTTP {res.status_code}"
+    return bool(body.get('success')), body.get('msg') or f"HTTP {res.status_code}"
+
+
+def _plan_change(action, client, days, now_ms):
+    """Return (updated client or None, human readable change) for an action"""
+    if action == "extend":
+        expiry = client.get('expiryTime', 0) or 0
+        if expiry == 0: return None, "no expiry set"
+        if expiry < 0:
+            # Negative expiry = duration that starts on first use
+            new_expiry = expiry - days * DAY_SECONDS * 1000
+        else:
+            new_expiry = max(expiry, now_ms) + days * DAY_SECONDS * 1000
+        updated = dict(client, expiryTime=new_expiry)
+        return updated, f"expiry +{days}d"
+    if action == "disable":
+        return dict(client, enable=False), "enable -> false"
+    if action == "reset":
+        return client, "traffic -> 0"
+    raise ValueError(f"Unknown action: {action}")
+
+
+def _run_panel(transport, server, targets, action, days, dry_run):
+    """Apply one action to all targets of a single panel, one request at a time"""
+    # The cookie session is shared with scans and probes; keep a re-login from racing the writes
+    with transport.server_lock(server):
+        return _run_panel_locked(transport, server, targets, action, days, dry_run)
+
+
+def _run_panel_locked(transport, server, targets, action, days, dry_run):
+    report = []
+
+    def add(user, result, detail):
+        report.append({"Server": server['name'], "User": user, "Action": ACTIONS[action],
+                       "Result": result, "Detail": detail})
+
+    try:
+        session, list_path, inbounds = _load_inbounds(transport, server)
+    except Exception as e:
+        for inbound_id, email in targets:
+            add(email, "❌ Failed", f"panel unreachable: {e}")
+        return report
+
+    prefix = API_PREFIXES[list_path]
+    base_url = server['url'].rstrip('/')
+
+    # Fresh client objects so we never write back stale fields
+    by_key = {}
+    for inbound in inbounds:
+        for client in inbound_clients(inbound):
+            by_key[(inbound.get('id'), client.get('email'))] = (inbound, client)
+
+    now_ms = int(time.time() * 1000)
+    for inbound_id, email in targets:
+        found = by_key.get((inbound_id, email))
+        if not found:
+            add(email, "⚠️ Skipped", "client not found on panel")
+            continue
+        inbound, client = found
+        updated, change = _plan_change(action, client, days, now_ms)
+        if updated is None:
+            add(email, "⚠️ Skipped", change)
+            continue
+        if dry_run:
+            add(email, "👁️ Dry Run", change)
+            continue
+
+        try:
+            if action == "reset":
+                ok, msg = _post(session, f"{base_url}{prefix}/{inbound_id}/resetClientTraffic/{quote(email)}", transport.timeout)
+            else:
+                key = _client_key(inbound.get('protocol'), client)
+                payload = {"id": inbound_id, "settings": json.dumps({"clients": [updated]})}
+                ok, msg = _post(session, f"{base_url}{prefix}/updateClient/{key}", transport.timeout, data=payload)
+            add(email, "✅ Done" if ok else "❌ Failed", change if ok else msg)
+        except Exception as e:
+            add(email, "❌ Failed", str(e))
+    return report
+
+
+def run_bulk_action(servers, rows, action, days=30, dry_run=True, transport=None):
+    """
+    Apply `action` to alert rows (dicts with Server, InboundId, User).
+    Panels are processed concurrently; returns a list of report rows.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown action: {action}")
+    if not isinstance(transport, RequestsTransport):
+        transport = RequestsTransport()
+
+    server_map = {s['name']: s for s in servers}
+    per_panel = {}
+    report = []
+    for row in rows:
+        if row.get('User') in (None, "-"): continue
+        try:
+            inbound_id = int(row.get('InboundId'))
+        except (TypeError, ValueError):
+            continue  # failed-server rows have no inbound (NaN once in a DataFrame)
+        if row['Server'] not in server_map:
+            report.append({"Server": row['Server'], "User": row['User'], "Action": ACTIONS[action],
+                           "Result": "❌ Failed", "Detail": "server no longer configured"})
+            continue
+        per_panel.setdefault(row['Server'], []).append((inbound_id, row['User']))
+
+    if not per_panel: return report
+
+    with ThreadPoolExecutor(max_workers=min(MAX_PANEL_WORKERS, len(per_panel))) as pool:
+        futures = [
+            pool.submit(_run_panel, transport, server_map[name], targets, action, days, dry_run)
+            for name, targets in per_panel.items()
+        ]
+        for f in futures:
+            report.extend(f.result())
+    return report
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+X-UI Monitor - Scan Profiler
+Opt-in profiling of a scan. Each profiled scan gets a directory with:
+
+    scan.prof        cProfile stats of the scanning thread (snakeviz, pstats, speedscope)
+    scan.collapsed   sampled stacks of the scan's threads in collapsed format
+                     (flamegraph.pl, speedscope, inferno)
+    meta.json        duration and sample count
+
+The sampler also sees the transport's fetch thread (the async transport's
+event loop), which cProfile alone would miss.
+
+    python3 profiler.py list
+    python3 profiler.py top <scan_id> [-n 25]
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+
+from transport import FETCH_THREAD_NAME
+
+PROFILES_DIR = "profiles"
+KEEP_PROFILES = 20
+SAMPLE_INTERVAL = 0.005
+MAX_STACK_DEPTH = 64
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ScanProfiler:
+    """Context manager: cProfile + stack sampling around one scan, saved on exit"""
+
+    def __init__(self, base_dir=PROFILES_DIR, scan_id=None, interval=SAMPLE_INTERVAL):
+        self.scan_id = scan_id or time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(base_dir, self.scan_id)
+        self.interval = interval
+        self.stacks = Counter()
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._owner = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self.profile = cProfile.Profile()
+        self._start = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self.elapsed = time.perf_counter() - self._start
+        self._stop.set()
+        self._sampler.join()
+        self.save()
+        return False
+
+    def _sample(self):
+        # Only the scanning thread and the transport's fetch threads; Streamlit's
+        # script runners and idle server threads would drown the graph
+        while not self._stop.wait(self.interval):
+            fetchers = {t.ident for t in threading.enumerate() if t.name == FETCH_THREAD_NAME}
+            for ident, frame in sys._current_frames().items():
+                if ident != self._owner and ident not in fetchers: continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.profile.dump_stats(os.path.join(self.path, "scan.prof"))
+        with open(os.path.join(self.path, "scan.collapsed"), "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({"scan_id": self.scan_id, "elapsed": round(self.elapsed, 3),
+                       "samples": sum(self.stacks.values())}, f)
+
+
+def list_profiles(base_dir=PROFILES_DIR):
+    """Profile ids, newest first"""
+    if not os.path.isdir(base_dir): return []
+    return sorted((d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))), reverse=True)
+
+def prune_profiles(keep=KEEP_PROFILES, base_dir=PROFILES_DIR):
+    for scan_id in list_profiles(base_dir)[keep:]:
+        shutil.rmtree(os.path.join(base_dir, scan_id), ignore_errors=True)
+
+def profile_exists(scan_id, base_dir=PROFILES_DIR):
+    """False once prune_profiles removed it (or it never finished saving)"""
+    return os.path.isfile(os.path.join(base_dir, scan_id, "scan.prof"))
+
+def profile_meta(scan_id, base_dir=PROFILES_DIR):
+    try:
+        with open(os.path.join(base_dir, scan_id, "meta.json")) as f:
+            return json.load(f)
+    except:
+        return {"scan_id": scan_id, "elapsed": None, "samples": 0}
+
+def profile_file(scan_id, kind="prof", base_dir=PROFILES_DIR):
+    """Raw bytes of scan.prof / scan.collapsed for download"""
+    with open(os.path.join(base_dir, scan_id, f"scan.{kind}"), "rb") as f:
+        return f.read()
+
+def top_functions(scan_id, limit=25, base_dir=PROFILES_DIR):
+    """Hottest functions of a profiled scan by own time"""
+    stats = pstats.Stats(os.path.join(base_dir, scan_id, "scan.prof"))
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "Function": func, "Where": f"{os.path.basename(filename)}:{line}" if line else "built-in",
+            "Calls": ncalls, "Own (ms)": round(tottime * 1000, 1), "Total (ms)": round(cumtime * 1000, 1),
+        })
+    rows.sort(key=lambda r: -r["Own (ms)"])
+    return rows[:limit]
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Main Entry Point
+#═══════════════════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect profiled X-UI scans")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    sub.add_parser("list", help="list profiled scans")
+    p_top = sub.add_parser("top", help="show the hottest functions of a scan")
+    p_top.add_argument("scan_id")
+    p_top.add_argument("-n", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.mode == "list":
+        for scan_id in list_profiles():
+            meta = profile_meta(scan_id)
+            print(f"{scan_id}  {meta['elapsed'] or '-'}s  {meta['samples']} samples")
+        sys.exit(0)
+
+    if not profile_exists(args.scan_id):
+        print(f"Profile '{args.scan_id}' not found")
+        sys.exit(1)
+
+    print(f"{'Own (ms)':>10} {'Total (ms)':>11} {'Calls':>9}  Function")
+    for r in top_functions(args.scan_id, args.n):
+        print(f"{r['Own (ms)']:>10} {r['Total (ms)']:>11} {r['Calls']:>9}  {r['Function']} ({r['Where']})")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+X-UI Monitor - Scan Recorder
+Saves the inbound payloads of a scan (gzip JSON, one file per server) and
+replays them through process_clients with any thresholds, without network.
+Only the fields classification needs are kept: client UUIDs, passwords and
+stream settings (keys, certificates) never reach the disk.
+
+    python3 recorder.py list
+    python3 recorder.py replay <scan_id> --days 3 --gb 2 --hide 7
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+from scanner import inbound_clients, process_clients
+
+RECORDINGS_DIR = "recordings"
+KEEP_RECORDINGS = 20
+
+# Everything process_clients / extract_metrics read; the rest of a payload is dropped
+INBOUND_FIELDS = ("id", "remark", "protocol")
+CLIENT_FIELDS = ("email", "enable", "totalGB", "expiryTime", "up", "down")
+
+
+def _safe_name(server_name):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', server_name)
+
+def strip_secrets(inbounds):
+    """Copy of the inbounds with only the fields replay needs"""
+    stripped = []
+    for inbound in inbounds:
+        item = {k: inbound[k] for k in INBOUND_FIELDS if k in inbound}
+        item["settings"] = {"clients": [{k: c[k] for k in CLIENT_FIELDS if k in c} for c in inbound_clients(inbound)]}
+        if inbound.get('clientStats'):
+            item["clientStats"] = [{k: st[k] for k in CLIENT_FIELDS if k in st} for st in inbound['clientStats']]
+        stripped.append(item)
+    return stripped
+
+
+class ScanRecorder:
+    """Writes one recording directory per scan"""
+
+    def __init__(self, base_dir=RECORDINGS_DIR, scan_id=None):
+        self.scan_id = scan_id or time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(base_dir, self.scan_id)
+        os.makedirs(self.path, exist_ok=True)
+
+    def save(self, server_name, inbounds):
+        payload = {"server": server_name, "recorded_at": int(time.time() * 1000), "inbounds": strip_secrets(inbounds)}
+        target = os.path.join(self.path, f"{_safe_name(server_name)}.json.gz")
+        with gzip.open(f"{target}.tmp", "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(f"{target}.tmp", target)
+
+
+class RecordingTransport:
+    """Wraps a transport and records every successful inbound payload it fetches"""
+
+    def __init__(self, transport, recorder):
+        self.transport = transport
+        self.recorder = recorder
+        self.name = transport.name
+
+    def fetch_inbounds(self, server):
+        inbounds = self.transport.fetch_inbounds(server)
+        if inbounds: self.recorder.save(server['name'], inbounds)
+        return inbounds
+
+    def fetch_many(self, servers):
+        for server, inbounds in self.transport.fetch_many(servers):
+            if inbounds: self.recorder.save(server['name'], inbounds)
+            yield server, inbounds
+
+    def __getattr__(self, attr):
+        return getattr(self.transport, attr)
+
+
+def list_recordings(base_dir=RECORDINGS_DIR):
+    """Recording ids, newest first"""
+    if not os.path.isdir(base_dir): return []
+    return sorted((d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))), reverse=True)
+
+def prune_recordings(keep=KEEP_RECORDINGS, base_dir=RECORDINGS_DIR):
+    for scan_id in list_recordings(base_dir)[keep:]:
+        shutil.rmtree(os.path.join(base_dir, scan_id), ignore_errors=True)
+
+def load_recording(scan_id, base_dir=RECORDINGS_DIR):
+    """Yield (server_name, inbounds, recorded_at_ms) for every server in a recording"""
+    path = os.path.join(base_dir, scan_id)
+    for name in sorted(os.listdir(path)):
+        if not name.endswith(".json.gz"): continue
+        with gzip.open(os.path.join(path, name), "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        yield payload["server"], payload["inbounds"], payload["recorded_at"]
+
+def replay(scan_id, warning_days, warning_gb, hide_days, debug=False, servers=None, base_dir=RECORDINGS_DIR):
+    """
+    Classify a recorded scan with the given thresholds. "Now" is pinned to the
+    time each payload was recorded, so results are reproducible.
+    """
+    rows = []
+    for server_name, inbounds, recorded_at in load_recording(scan_id, base_dir):
+        if servers is not None and server_name not in servers: continue
+        rows.extend(process_clients(server_name, inbounds, warning_days, warning_gb, hide_days,
+                                    debug=debug, now_ms=recorded_at))
+    return rows
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Main Entry Point
+#═══════════════════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record / replay X-UI scans")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    sub.add_parser("list", help="list recorded scans")
+    p_replay = sub.add_parser("replay", help="replay a recorded scan")
+    p_replay.add_argument("scan_id")
+    p_replay.add_argument("--days", type=float, default=3)
+    p_replay.add_argument("--gb", type=float, default=2.0)
+    p_replay.add_argument("--hide", type=float, default=7)
+    p_replay.add_argument("--debug", action="store_true")
+    p_replay.add_argument("--json", action="store_true", help="print rows as JSON lines")
+    args = parser.parse_args()
+
+    if args.mode == "list":
+        for scan_id in list_recordings():
+            files = [f for f in os.listdir(os.path.join(RECORDINGS_DIR, scan_id)) if f.endswith(".json.gz")]
+            print(f"{scan_id}  ({len(files)} servers)")
+        sys.exit(0)
+
+    if args.scan_id not in list_recordings():
+        print(f"Recording '{args.scan_id}' not found")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    rows = replay(args.scan_id, args.days, args.gb, args.hide, debug=args.debug)
+    elapsed = time.perf_counter() - start
+    if args.json:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        counts = {}
+        for row in rows:
+            counts[row['Status']] = counts.get(row['Status'], 0) + 1
+        for status, n in sorted(counts.items(), key=lambda x: -x[1]):
+            print(f"{status:<14} {n}")
+        print(f"{len(rows)} rows in {elapsed * 1000:.0f} ms")
@@ -0,0 +1,86 @@
+"""
+X-UI Monitor - Per-Server Result Store
+Scan results are kept as one block per server, so each admin's view is just
+the concatenation of the blocks for the servers they are allowed to see.
+One store is shared by every dashboard session in the process.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+
+LATEST_FILE = "latest_scan.json.gz"
+
+
+def failed_row(server_name):
+    return {"Server": server_name, "User": "-", "Status": "❌ Failed", "Rem": "-", "Time": "-", "ExpDate": "-"}
+
+
+class ResultStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def put(self, server_name, rows, ok=True, scanned_at=None, metrics=None):
+        """
+        Replace one server's block (rows are not copied; treat them as read-only).
+        `metrics` are the raw per-client arrays from scanner.extract_metrics, kept
+        so other thresholds can be evaluated without rescanning.
+        """
+        block = {"rows": rows if ok else [failed_row(server_name)], "ok": ok,
+                 "scanned_at": int(scanned_at or time.time()), "metrics": metrics if ok else None}
+        with self._lock:
+            self._blocks[server_name] = block
+
+    def drop(self, server_name):
+        with self._lock:
+            self._blocks.pop(server_name, None)
+
+    def view(self, server_names=None):
+        """Rows of the given servers (None = all), in the order given"""
+        with self._lock:
+            names = list(self._blocks) if server_names is None else server_names
+            blocks = [self._blocks[n] for n in names if n in self._blocks]
+        rows = []
+        for block in blocks:
+            rows.extend(block["rows"])
+        return rows
+
+    def blocks(self, server_names=None):
+        """[(server_name, block)] for the given servers (None = all)"""
+        with self._lock:
+            names = list(self._blocks) if server_names is None else server_names
+            return [(n, self._blocks[n]) for n in names if n in self._blocks]
+
+    def last_scan(self, server_names=None):
+        with self._lock:
+            names = list(self._blocks) if server_names is None else server_names
+            stamps = [self._blocks[n]["scanned_at"] for n in names if n in self._blocks]
+        return max(stamps) if stamps else None
+
+
+def _json_safe(row):
+    # InboundId may be a numpy/pandas number or NaN after a DataFrame round trip
+    inbound_id = row.get("InboundId")
+    try:
+        inbound_id = int(inbound_id) if inbound_id is not None else None
+    except (TypeError, ValueError):
+        inbound_id = None
+    return dict(row, InboundId=inbound_id)
+
+
+def write_snapshot(store, path=LATEST_FILE):
+    """Write every block to a gzip JSON file for out-of-process readers (api_server.py)"""
+    servers = []
+    rows = []
+    for name, block in store.blocks():
+        servers.append({"server": name, "ok": block["ok"], "scanned_at": block["scanned_at"],
+                        "alerts": sum(1 for r in block["rows"] if r.get("User") != "-")})
+        rows.extend(_json_safe(r) for r in block["rows"])
+    snapshot = {"generated_at": int(time.time()), "servers": servers, "rows": rows}
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp, path)
@@ -0,0 +1,142 @@
+"""
+X-UI Monitor - Background Scan Jobs
+Scans run as queued jobs on a worker thread, outside any Streamlit script run,
+so closing the tab or clicking around never loses a scan. Finished servers
+land in the shared ResultStore as they arrive; a request for servers that an
+active job already covers joins that job instead of starting another scan.
+"""
+
+import queue
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+import alert_state
+import client_index
+from profiler import ScanProfiler, prune_profiles
+from recorder import RecordingTransport, ScanRecorder, prune_recordings
+from result_store import write_snapshot
+from scanner import extract_metrics, classify_metrics
+from utils import load_settings
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_CANCELLED = "cancelled"
+JOB_FAILED = "failed"
+KEEP_JOBS = 20
+
+
+def finalize_scan(store, scanned_names, ok_names):
+    """Tag the stored rows with alert state, refresh latest_scan.json.gz; returns resolved alerts"""
+    # Alert state follows the saved global thresholds, not whichever admin started the scan
+    filters = load_settings()['filters']
+    current = alert_state.current_alerts(store.blocks(ok_names), filters['days'], filters['gb'], filters['hide'])
+    states, resolved = alert_state.record_scan(current, ok_names)
+    rows = store.view(scanned_names)
+    for row in rows:
+        row['State'] = states.get((row['Server'], row['User']), "")
+    write_snapshot(store)
+    return resolved
+
+
+class ScanJob:
+    def __init__(self, servers, thresholds, record=False, profile=False, requested_by=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.servers = servers
+        self.names = [s['name'] for s in servers]
+        self.thresholds = thresholds
+        self.record = record
+        self.profile = profile
+        self.requested_by = requested_by
+        self.scan_id = None
+        self.status = JOB_QUEUED
+        self.done = []
+        self.ok = []
+        self.resolved = []
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in (JOB_QUEUED, JOB_RUNNING)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class JobManager:
+    """One worker thread running queued scan jobs in order"""
+
+    def __init__(self, store, transport):
+        self.store = store
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._queue = queue.Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, servers, thresholds, record=False, profile=False, requested_by=None):
+        """Queue a scan, or return the active job that already covers these servers"""
+        wanted = {s['name'] for s in servers}
+        with self._lock:
+            for job in self._jobs.values():
+                if job.active and not job.cancel_event.is_set() and wanted <= set(job.names):
+                    return job
+            job = ScanJob(servers, thresholds, record, profile, requested_by)
+            self._jobs[job.id] = job
+            for old in [j for j in self._jobs.values() if not j.active][:-KEEP_JOBS]:
+                del self._jobs[old.id]
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job.cancel_event.is_set():
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+                continue
+            job.status = JOB_RUNNING
+            try:
+                self._run(job)
+                job.status = JOB_CANCELLED if job.cancel_event.is_set() else JOB_DONE
+            except Exception as e:
+                job.error = str(e)
+                job.status = JOB_FAILED
+            job.finished_at = time.time()
+
+    def _run(self, job):
+        warning_days, warning_gb, hide_days, debug = job.thresholds
+        job.scan_id = time.strftime("%Y%m%d-%H%M%S")
+        transport = self.transport
+        if job.record:
+            transport = RecordingTransport(transport, ScanRecorder(scan_id=job.scan_id))
+        # The client index stores real statuses under the saved global thresholds
+        filters = load_settings()['filters']
+        with ScanProfiler(scan_id=job.scan_id) if job.profile else nullcontext():
+            try:
+                for s, inbounds in transport.fetch_many(job.servers):
+                    if inbounds:
+                        metrics = extract_metrics(inbounds)
+                        alerts = classify_metrics(s['name'], metrics, warning_days, warning_gb, hide_days, debug=debug)
+                        self.store.put(s['name'], alerts, metrics=metrics)
+                        client_index.update_server(s['name'], metrics, filters['days'], filters['gb'])
+                        job.ok.append(s['name'])
+                    else:
+                        self.store.put(s['name'], [], ok=False)
+                    job.done.append(s['name'])
+                    if job.cancel_event.is_set(): break
+            finally:
+                # Servers finished before a cancel or error still count as scanned
+                if job.done:
+                    job.resolved = finalize_scan(self.store, list(job.done), list(job.ok))
+        if job.record: prune_recordings()
+        if job.profile: prune_profiles()
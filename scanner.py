@@ -0,0 +1,225 @@
+"""
+X-UI Monitor - Client Classification
+Turns raw inbound lists fetched from a panel into alert rows.
+Kept free of Streamlit so it can be reused by benchmarks and tools.
+"""
+
+import json
+import re
+import time
+
+import numpy as np
+
+from formatting import DAY_SECONDS, format_time_remaining, jalali_series, time_remaining_series, to_jalali
+
+GB = 1024 * 1024 * 1024
+MB = 1024 * 1024
+
+
+ALERT_MARKERS = ("⛔", "☠️", "🪫", "⏱️")
+
+
+def is_alert_status(status):
+    return any(m in status for m in ALERT_MARKERS)
+
+def extract_core_phone(username):
+    digits_only = re.sub(r'\D', '', username)
+    match_98 = re.search(r'98(9\d{9})', digits_only)
+    if match_98: return match_98.group(1)
+    match_09 = re.search(r'0(9\d{9})', digits_only)
+    if match_09: return match_09.group(1)
+    return None
+
+def inbound_clients(inbound):
+    """Return the client list of an inbound, parsing its settings JSON if needed"""
+    try:
+        settings = inbound['settings']
+        if isinstance(settings, str): settings = json.loads(settings)
+        return settings.get('clients', [])
+    except: return []
+
+def process_clients(server_name, inbounds, warning_days, warning_gb, hide_days, debug=False, now_ms=None):
+    """now_ms pins "now" (e.g. to a recording's time) instead of the wall clock"""
+    alerts = []
+    current_time = int(now_ms if now_ms is not None else time.time() * 1000)
+    for inbound in inbounds:
+        stats_map = {}
+        if 'clientStats' in inbound:
+            for stat in inbound['clientStats']:
+                stats_map[stat['email']] = {'up': stat.get('up',0), 'down': stat.get('down',0)}
+        clients = inbound_clients(inbound)
+        
+        for client in clients:
+            email = client.get('email', 'Unknown')
+            enable = client.get('enable', True)
+            is_enabled = True
+            if enable is False or str(enable).lower() == "false" or enable == 0: is_enabled = False
+            
+            if not is_enabled and not debug: continue
+            
+            real_stats = stats_map.get(email)
+            if real_stats:
+                up, down = real_stats['up'], real_stats['down']
+            else:
+                up, down = client.get('up', 0), client.get('down', 0)
+            
+            total_allowed = client.get('totalGB', 0)
+            expiry_time = client.get('expiryTime', 0)
+            formatted_rem, days_left_formatted = "∞", "∞"
+            status, jalali_expiry = "OK", "-"
+            total_usage = up + down
+            
+            if total_allowed > 0:
+                remaining = total_allowed - total_usage
+                remaining_gb_val = remaining / GB
+                if remaining <= 0: status = "⛔ ENDED"
+                elif remaining_gb_val < warning_gb:
+                    if total_usage > 0: status = f"🪫 LOW DATA"
+                if remaining_gb_val < 1: formatted_rem = f"{int(remaining/MB)}MB"
+                else: formatted_rem = f"{remaining_gb_val:.1f}GB"
+            
+            is_zombie = False
+            if expiry_time > 0:
+                diff_ms = expiry_time - current_time
+                if diff_ms <= 0:
+                    if (abs(diff_ms)/(1000*DAY_SECONDS)) > hide_days: is_zombie = True
+                    if "ENDED" not in status: status = "☠️ EXPIRED" 
+                elif diff_ms < (warning_days * DAY_SECONDS * 1000):
+                    if "ENDED" not in status: status = f"⏱️ SOON"
+
+            show_row = False
+            if debug: show_row = True
+            else:
+                if is_zombie: show_row = False
+                elif is_alert_status(status): show_row = True
+            
+            if show_row:
+                # Dates are only formatted for rows that are actually kept
+                if expiry_time > 0:
+                    jalali_expiry = to_jalali(expiry_time)
+                    days_left_formatted = format_time_remaining(diff_ms / (1000 * DAY_SECONDS))
+                alerts.append({
+                    "Server": server_name, "InboundId": inbound.get('id'), "User": email, "Status": status,
+                    "Rem": formatted_rem, "Time": days_left_formatted,
+                    "ExpDate": jalali_expiry
+                })
+    return alerts
+
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Raw metrics & vectorized classification
+#═══════════════════════════════════════════════════════════════════════════════
+# Same rules as process_clients, but over arrays kept from the last scan so
+# threshold changes can be re-evaluated without refetching.
+
+DAY_MS = DAY_SECONDS * 1000
+
+# Status codes; the order of overrides below mirrors process_clients
+CODE_OK, CODE_ENDED, CODE_EXPIRED, CODE_LOW, CODE_SOON = range(5)
+STATUS_LABELS = ["OK", "⛔ ENDED", "☠️ EXPIRED", "🪫 LOW DATA", "⏱️ SOON"]
+
+def extract_metrics(inbounds, scanned_at_ms=None):
+    """Flatten a panel's inbounds into per-client arrays (one entry per client)"""
+    emails, inbound_ids, inbound_labels, totals, usages, expiries, enabled = [], [], [], [], [], [], []
+    for inbound in inbounds:
+        label = str(inbound.get('remark') or inbound.get('id') or '-')
+        stats_map = {}
+        for stat in inbound.get('clientStats') or []:
+            stats_map[stat['email']] = (stat.get('up', 0) or 0) + (stat.get('down', 0) or 0)
+        for client in inbound_clients(inbound):
+            email = client.get('email', 'Unknown')
+            enable = client.get('enable', True)
+            usage = stats_map.get(email)
+            if usage is None: usage = (client.get('up', 0) or 0) + (client.get('down', 0) or 0)
+            emails.append(email)
+            inbound_ids.append(inbound.get('id'))
+            inbound_labels.append(label)
+            totals.append(client.get('totalGB', 0) or 0)
+            usages.append(usage)
+            expiries.append(client.get('expiryTime', 0) or 0)
+            enabled.append(not (enable is False or str(enable).lower() == "false" or enable == 0))
+    return {
+        "email": emails,
+        "inbound_id": inbound_ids,
+        "inbound": inbound_labels,
+        "total": np.array(totals, dtype=np.float64),
+        "usage": np.array(usages, dtype=np.float64),
+        "expiry": np.array(expiries, dtype=np.int64),
+        "enabled": np.array(enabled, dtype=bool),
+        "scanned_at": int(scanned_at_ms if scanned_at_ms is not None else time.time() * 1000),
+    }
+
+def metrics_to_json(metrics):
+    """Plain-JSON form of extract_metrics output (e.g. for collector snapshots)"""
+    return {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in metrics.items()}
+
+def metrics_from_json(data):
+    return {
+        "email": data["email"],
+        "inbound_id": data["inbound_id"],
+        "inbound": data["inbound"],
+        "total": np.array(data["total"], dtype=np.float64),
+        "usage": np.array(data["usage"], dtype=np.float64),
+        "expiry": np.array(data["expiry"], dtype=np.int64),
+        "enabled": np.array(data["enabled"], dtype=bool),
+        "scanned_at": int(data["scanned_at"]),
+    }
+
+def classify_codes(metrics, warning_days, warning_gb, hide_days, debug=False):
+    """Return (status codes, shown mask) for every client in `metrics`"""
+    total, usage, expiry = metrics["total"], metrics["usage"], metrics["expiry"]
+    remaining = total - usage
+    codes = np.zeros(len(total), dtype=np.int8)
+
+    limited = total > 0
+    ended = limited & (remaining <= 0)
+    codes[limited & ~ended & (remaining / GB < warning_gb) & (usage > 0)] = CODE_LOW
+
+    has_expiry = expiry > 0
+    diff = expiry - metrics["scanned_at"]
+    expired = has_expiry & (diff <= 0)
+    codes[expired] = CODE_EXPIRED
+    codes[has_expiry & (diff > 0) & (diff < warning_days * DAY_MS)] = CODE_SOON
+    codes[ended] = CODE_ENDED
+
+    if debug:
+        shown = np.ones(len(total), dtype=bool)
+    else:
+        zombie = expired & (np.abs(diff) / DAY_MS > hide_days)
+        shown = metrics["enabled"] & ~zombie & (codes != CODE_OK)
+    return codes, shown
+
+def count_flags(metrics_list, warning_days, warning_gb, hide_days):
+    """How many clients each alert status would flag with these thresholds"""
+    counts = np.zeros(len(STATUS_LABELS), dtype=np.int64)
+    for metrics in metrics_list:
+        codes, shown = classify_codes(metrics, warning_days, warning_gb, hide_days)
+        counts += np.bincount(codes[shown], minlength=len(STATUS_LABELS))
+    return {STATUS_LABELS[c]: int(counts[c]) for c in range(1, len(STATUS_LABELS))}
+
+def classify_metrics(server_name, metrics, warning_days, warning_gb, hide_days, debug=False):
+    """Alert rows for `metrics`, identical to what process_clients returns for the same scan"""
+    codes, shown = classify_codes(metrics, warning_days, warning_gb, hide_days, debug)
+    idx = np.flatnonzero(shown)
+    if not len(idx): return []
+
+    total = metrics["total"][idx]
+    remaining = total - metrics["usage"][idx]
+    expiry = metrics["expiry"][idx]
+    days_left = np.where(expiry > 0, (expiry - metrics["scanned_at"]) / DAY_MS, np.inf)
+    times = time_remaining_series(days_left)
+    dates = jalali_series(expiry)
+
+    rows = []
+    emails, inbound_ids = metrics["email"], metrics["inbound_id"]
+    for j, i in enumerate(idx.tolist()):
+        if total[j] > 0:
+            rem_gb = remaining[j] / GB
+            rem = f"{int(remaining[j] / MB)}MB" if rem_gb < 1 else f"{rem_gb:.1f}GB"
+        else:
+            rem = "∞"
+        rows.append({
+            "Server": server_name, "InboundId": inbound_ids[i], "User": emails[i],
+            "Status": STATUS_LABELS[codes[i]], "Rem": rem, "Time": times[j], "ExpDate": dates[j]
+        })
+    return rows
@@ -0,0 +1,296 @@
+"""
+X-UI Monitor - Panel Transport Layer
+Small interface over the HTTP client used to log in to X-UI panels and
+fetch their inbound lists.
+
+Backends:
+  requests  - blocking, one server at a time (default)
+  async     - httpx.AsyncClient, concurrent, HTTP/2 when the panel offers it
+
+Select the backend with the XUI_TRANSPORT environment variable.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+try:
+    import brotli  # noqa: F401
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Inbound list endpoints of the different X-UI forks, tried in order
+API_ENDPOINTS = [
+    "/panel/api/inbounds/list",
+    "/xui/API/inbounds/",
+    "/xui/API/inbounds",
+    "/xui/API/inbounds/list",
+    "/api/inbounds/list",
+]
+
+# Only advertise brotli when we can actually decode it
+ACCEPT_ENCODING = "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate"
+
+# Where the client-management endpoints live for each inbound list endpoint
+# (RequestsTransport.api_paths remembers which list endpoint a panel answered)
+API_PREFIXES = {
+    "/panel/api/inbounds/list": "/panel/api/inbounds",
+    "/xui/API/inbounds/": "/xui/API/inbounds",
+    "/xui/API/inbounds": "/xui/API/inbounds",
+    "/xui/API/inbounds/list": "/xui/API/inbounds",
+    "/api/inbounds/list": "/api/inbounds",
+}
+
+DEFAULT_TIMEOUT = 8
+# Name of the thread fetch_many runs its event loop on (the scan profiler samples it)
+FETCH_THREAD_NAME = "xui-fetch"
+DEFAULT_MAX_CONNECTIONS = 20
+
+
+def _base_url(server):
+    return server['url'].rstrip('/')
+
+
+def _login_payload(server):
+    return {"username": server['username'], "password": server['password']}
+
+
+def _extract_inbounds(data):
+    """Return the inbound list from a panel JSON response, or None"""
+    if isinstance(data, dict) and data.get('success'):
+        return data.get('obj')
+    return None
+
+
+#═══════════════════════════════════════════════════════════════════════════════
+# requests backend
+#═══════════════════════════════════════════════════════════════════════════════
+
+class RequestsTransport:
+    """
+    Blocking backend; keeps one cookie session per server for reuse.
+    Shared by the scan worker and dashboard sessions, so everything that uses a
+    server's session (login, fetch, probe, bulk writes) holds server_lock().
+    """
+
+    name = "requests"
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.sessions = {}
+        self.api_paths = {}
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    def server_lock(self, server):
+        with self._guard:
+            return self._locks.setdefault(server['name'], threading.RLock())
+
+    def session_for(self, server):
+        with self._guard:
+            session = self.sessions.get(server['name'])
+            if session is None:
+                session = requests.Session()
+                session.verify = False
+                session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+                adapter = HTTPAdapter(pool_maxsize=self.max_connections)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[server['name']] = session
+            return session
+
+    def login(self, server):
+        """Log in and return the cookie session (raises on network errors)"""
+        with self.server_lock(server):
+            session = self.session_for(server)
+            session.post(f"{_base_url(server)}/login", data=_login_payload(server), timeout=self.timeout)
+            return session
+
+    def fetch_inbounds(self, server):
+        with self.server_lock(server):
+            return self._fetch_inbounds(server)
+
+    def _fetch_inbounds(self, server):
+        try:
+            session = self.login(server)
+        except: return None
+
+        base_url = _base_url(server)
+        for path in API_ENDPOINTS:
+            try:
+                res = session.get(f"{base_url}{path}", timeout=self.timeout)
+                if res.status_code == 200:
+                    try:
+                        inbounds = _extract_inbounds(res.json())
+                        if inbounds is not None:
+                            self.api_paths[server['name']] = path
+                            return inbounds
+                    except: pass
+            except: pass
+        return None
+
+    def fetch_many(self, servers):
+        """Yield (server, inbounds) pairs, one server after another"""
+        for server in servers:
+            yield server, self.fetch_inbounds(server)
+
+    def probe(self, server, timeout=10):
+        """Return (login_status, [(url, status_code, error), ...]); raises if login fails"""
+        with self.server_lock(server):
+            return self._probe(server, timeout)
+
+    def _probe(self, server, timeout):
+        session = self.session_for(server)
+        base_url = _base_url(server)
+        res = session.post(f"{base_url}/login", data=_login_payload(server), timeout=timeout)
+        results = []
+        for path in API_ENDPOINTS:
+            url = f"{base_url}{path}"
+            try:
+                r = session.get(url, timeout=timeout)
+                results.append((url, r.status_code, None))
+            except Exception as e:
+                results.append((url, None, e))
+        return res.status_code, results
+
+    def close(self):
+        with self._guard:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+            self.api_paths = {}
+
+
+#═══════════════════════════════════════════════════════════════════════════════
+# httpx (async) backend
+#═══════════════════════════════════════════════════════════════════════════════
+
+class HttpxTransport:
+    """
+    Concurrent backend on httpx.AsyncClient.
+
+    Each server gets its own client (X-UI cookies are host-scoped and several
+    panels often share one IP), while a shared semaphore caps how many panels
+    are talked to at once.
+    """
+
+    name = "async"
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_connections=DEFAULT_MAX_CONNECTIONS, http2=True):
+        if httpx is None:
+            raise RuntimeError("httpx is not installed")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.http2 = http2 and HAS_HTTP2
+
+    def _client(self, timeout):
+        return httpx.AsyncClient(
+            verify=False,
+            http2=self.http2,
+            timeout=timeout,
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+
+    async def _fetch(self, server, semaphore):
+        base_url = _base_url(server)
+        async with semaphore:
+            async with self._client(self.timeout) as client:
+                try:
+                    await client.post(f"{base_url}/login", data=_login_payload(server))
+                except: return None
+
+                for path in API_ENDPOINTS:
+                    try:
+                        res = await client.get(f"{base_url}{path}")
+                        if res.status_code == 200:
+                            try:
+                                inbounds = _extract_inbounds(res.json())
+                                if inbounds is not None: return inbounds
+                            except: pass
+                    except: pass
+                return None
+
+    async def _run_many(self, servers, out):
+        semaphore = asyncio.Semaphore(self.max_connections)
+
+        async def one(server):
+            try:
+                inbounds = await self._fetch(server, semaphore)
+            except:
+                inbounds = None
+            out.put((server, inbounds))
+
+        await asyncio.gather(*(one(s) for s in servers))
+
+    def fetch_inbounds(self, server):
+        return asyncio.run(self._fetch(server, asyncio.Semaphore(1)))
+
+    def fetch_many(self, servers):
+        """Yield (server, inbounds) pairs in completion order"""
+        servers = list(servers)
+        out = queue.Queue()
+        # Run the event loop on a worker thread so callers (e.g. Streamlit)
+        # can update progress while panels are still being fetched
+        worker = threading.Thread(target=lambda: asyncio.run(self._run_many(servers, out)),
+                                  name=FETCH_THREAD_NAME, daemon=True)
+        worker.start()
+        for _ in servers:
+            yield out.get()
+        worker.join()
+
+    async def _probe(self, server, timeout):
+        base_url = _base_url(server)
+        async with self._client(timeout) as client:
+            res = await client.post(f"{base_url}/login", data=_login_payload(server))
+            results = []
+            for path in API_ENDPOINTS:
+                url = f"{base_url}{path}"
+                try:
+                    r = await client.get(url)
+                    results.append((url, r.status_code, None))
+                except Exception as e:
+                    results.append((url, None, e))
+            return res.status_code, results
+
+    def probe(self, server, timeout=10):
+        return asyncio.run(self._probe(server, timeout))
+
+    def close(self):
+        pass
+
+
+#═══════════════════════════════════════════════════════════════════════════════
+# Factory
+#═══════════════════════════════════════════════════════════════════════════════
+
+def get_transport(name=None, **kwargs):
+    """Build the configured transport, falling back to requests if httpx is missing"""
+    name = (name or os.environ.get("XUI_TRANSPORT", "requests")).lower()
+    if name in ("async", "httpx") and httpx is not None:
+        return HttpxTransport(**kwargs)
+    return RequestsTransport(**kwargs)
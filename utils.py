@@ -4,6 +4,7 @@ from cryptography.fernet import Fernet
 
 CONFIG_FILE = "servers.enc"
 KEY_FILE = "secret.key"
+SETTINGS_FILE = "settings.json"
 
 def load_key():
     if not os.path.exists(KEY_FILE):
@@ -58,3 +59,31 @@ def delete_server(name):
     
     with open(CONFIG_FILE, "wb") as f:
         f.write(encrypted_data)
+
+def get_default_settings():
+    return {
+        "filters": {"days": 3, "gb": 2.0, "hide": 7, "debug": False},
+        "templates": {
+            "ended": "مشترک گرامی {user}، حجم سرویس شما به پایان رسیده است.\nلطفا جهت تمدید اقدام فرمایید.",
+            "expired": "مشترک گرامی {user}، زمان سرویس شما به پایان رسیده است.\nلطفا جهت تمدید اقدام فرمایید.",
+            "low": "مشترک گرامی {user}، تنها {rem} از حجم سرویس شما باقی مانده است.\nتمدید میفرمایید؟",
+            "soon": "مشترک گرامی {user}، تنها {time} از زمان سرویس شما باقی مانده است.\nتمدید میفرمایید؟"
+        }
+    }
+
+def load_settings():
+    defaults = get_default_settings()
+    if os.path.exists(SETTINGS_FILE):
+        try:
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+                if "filters" not in saved: saved["filters"] = defaults["filters"]
+                if "templates" not in saved: saved["templates"] = defaults["templates"]
+                return saved
+        except:
+            return defaults
+    return defaults
+
+def save_all_settings(settings_dict):
+    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
+        json.dump(settings_dict, f, ensure_ascii=False, indent=4)